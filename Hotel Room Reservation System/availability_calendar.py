@@ -0,0 +1,126 @@
+# In-memory room availability calendar.
+# Booked nights are kept per room as a bitmap (bit i = night base_date + i), loaded once from the
+# reservations table and then updated incrementally by the reservation functions, so availability
+# checks need no query beyond PRAGMA data_version: when another connection has committed since the
+# calendar was loaded, refresh() loads it again. Nights outside [today, today + horizon_days) are not cached; for those the
+# calendar answers None and the caller falls back to the database.
+from datetime import date
+
+
+class AvailabilityCalendar:
+    def __init__(self, horizon_days=730, base_date=None):
+        self.horizon_days = horizon_days
+        self.base = (base_date or date.today()).toordinal()
+        self._booked = {}          # room_number -> bitmap of booked nights
+        self._stays = {}           # room_number -> {reservation_id: (first_night, end_night)}
+        self._room_of = {}         # reservation_id -> room_number
+        self._room_type = {}       # room_number -> room_type
+        self._rate = {}            # room_number -> rate
+        self._data_version = None  # PRAGMA data_version of the loading connection at load time
+
+    def load(self, cursor):
+        self._booked.clear()
+        self._stays.clear()
+        self._room_of.clear()
+        self._room_type.clear()
+        self._rate.clear()
+        self._data_version = cursor.execute('''PRAGMA data_version''').fetchone()[0]
+        for room_number, room_type, rate in cursor.execute('''SELECT room_number, room_type, rate FROM rooms'''):
+            self.add_room(room_number, room_type, rate)
+        # stays that ended before the calendar starts can never conflict again
+        for reservation_id, room_number, check_in_date, check_out_date in cursor.execute(
+                '''SELECT reservation_id, room_number, check_in_date, check_out_date FROM reservations
+                   WHERE check_out_date > ?''', (date.fromordinal(self.base).isoformat(),)):
+            self._add_stay(reservation_id, room_number, check_in_date, check_out_date)
+        return self
+
+    # Reloads the calendar when other connections (the reservation service, other front desks) have
+    # committed since it was loaded; the write-through updates below only see this process's writes.
+    # cursor has to belong to the connection the calendar was loaded from.
+    def refresh(self, cursor):
+        if cursor.execute('''PRAGMA data_version''').fetchone()[0] != self._data_version:
+            self.load(cursor)
+        return self
+
+    # ---- lookups ----
+
+    def is_available(self, room_number, check_in_date, check_out_date):
+        mask = self._mask(check_in_date, check_out_date)
+        if mask is None:
+            return None
+        if room_number not in self._room_type:
+            return False
+        return not self._booked.get(room_number, 0) & mask
+
+    def available_rooms(self, check_in_date, check_out_date, room_type=None):
+        mask = self._mask(check_in_date, check_out_date)
+        if mask is None:
+            return None
+        return [(room_number, self._room_type[room_number], self._rate[room_number])
+                for room_number in sorted(self._room_type)
+                if (room_type is None or self._room_type[room_number] == room_type)
+                and not self._booked.get(room_number, 0) & mask]
+
+    def room_type(self, room_number):
+        return self._room_type.get(room_number)
+
+    def rate(self, room_number):
+        return self._rate.get(room_number)
+
+    # ---- write-through updates, mirroring what the reservation functions do in the database ----
+
+    def add_room(self, room_number, room_type, rate):
+        self._room_type[room_number] = room_type
+        self._rate[room_number] = rate
+
+    def book(self, reservation_id, room_number, check_in_date, check_out_date):
+        self._add_stay(reservation_id, room_number, check_in_date, check_out_date)
+
+    def move(self, reservation_id, room_number, check_in_date, check_out_date):
+        self.cancel(reservation_id)
+        self._add_stay(reservation_id, room_number, check_in_date, check_out_date)
+
+    def cancel(self, reservation_id):
+        room_number = self._room_of.pop(reservation_id, None)
+        if room_number is None:
+            return
+        stays = self._stays[room_number]
+        del stays[reservation_id]
+        # rebuilt from the remaining stays, in case stored reservations overlap each other
+        booked = 0
+        for first_night, end_night in stays.values():
+            booked |= self._range_bits(first_night, end_night)
+        self._booked[room_number] = booked
+
+    # ---- consistency check against the database ----
+
+    # returns the room numbers whose cached state differs from what the database holds
+    def verify(self, cursor):
+        fresh = AvailabilityCalendar(self.horizon_days, date.fromordinal(self.base)).load(cursor)
+        rooms = set(self._room_type) | set(fresh._room_type)
+        return sorted(room_number for room_number in rooms
+                      if self._room_type.get(room_number) != fresh._room_type.get(room_number)
+                      or self._booked.get(room_number, 0) != fresh._booked.get(room_number, 0))
+
+    # ---- helpers ----
+
+    def _add_stay(self, reservation_id, room_number, check_in_date, check_out_date):
+        first_night = max(date.fromisoformat(check_in_date).toordinal() - self.base, 0)
+        end_night = min(date.fromisoformat(check_out_date).toordinal() - self.base, self.horizon_days)
+        self._room_of[reservation_id] = room_number
+        self._stays.setdefault(room_number, {})[reservation_id] = (first_night, end_night)
+        self._booked[room_number] = self._booked.get(room_number, 0) | self._range_bits(first_night, end_night)
+
+    @staticmethod
+    def _range_bits(first_night, end_night):
+        if end_night <= first_night:
+            return 0
+        return ((1 << (end_night - first_night)) - 1) << first_night
+
+    # bitmap of the requested nights, or None when they fall outside the cached window
+    def _mask(self, check_in_date, check_out_date):
+        first_night = date.fromisoformat(check_in_date).toordinal() - self.base
+        end_night = date.fromisoformat(check_out_date).toordinal() - self.base
+        if first_night < 0 or end_night > self.horizon_days or end_night <= first_night:
+            return None
+        return self._range_bits(first_night, end_night)
@@ -0,0 +1,202 @@
+# Multi-process booking contention test.
+# Several front-desk processes book, move and cancel stays on one hotel_reservation.db through the
+# real reservation functions, each transaction run by DBbase.run_transaction. For every connection
+# configuration and process count it reports throughput, latency, time spent waiting for the write
+# lock, retries and failed ("database is locked") transactions, so configurations can be compared
+# and the point where a setup stops scaling is visible. Every run works on a fresh copy of the
+# database and ends with a check for overlapping stays, which must be zero.
+#
+# usage: python booking_contention_test.py [--processes 1,2,4,8,16] [--ops 200] [--mix 60,20,20]
+#                                          [--configs rollback-nowait,rollback,wal,wal-retry] [--output results.json]
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import db_base
+import hotel_db
+from reservation_loadtest import OVERLAPPING_PAIRS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# DBbase settings compared by the test; busy_timeout is in ms, None keeps sqlite3's 5 second default
+CONFIGS = {
+    'rollback-nowait': {'journal_mode': 'DELETE', 'busy_timeout': 0},
+    'rollback': {'journal_mode': 'DELETE', 'busy_timeout': 5000},
+    'wal': {'journal_mode': 'WAL', 'busy_timeout': 5000},
+    'wal-retry': {'journal_mode': 'WAL', 'busy_timeout': 50, 'retries': 10, 'backoff_ms': 5},
+}
+
+
+def book(cursor, customer_name, room_number, check_in_date, check_out_date):
+    if not hotel_db.room_is_free(cursor, room_number, check_in_date, check_out_date):
+        return None
+    total_cost = hotel_db.stay_cost(cursor, room_number, check_in_date, check_out_date)
+    return hotel_db.insert_reservation(cursor, customer_name, room_number, check_in_date, check_out_date, total_cost)
+
+
+def move(cursor, reservation_id, room_number, check_in_date, check_out_date):
+    if not hotel_db.room_is_free(cursor, room_number, check_in_date, check_out_date, reservation_id):
+        return False
+    total_cost = hotel_db.stay_cost(cursor, room_number, check_in_date, check_out_date)
+    return hotel_db.move_reservation(cursor, reservation_id, room_number, check_in_date, check_out_date, total_cost)
+
+
+def cancel(cursor, reservation_id):
+    return hotel_db.remove_reservation(cursor, reservation_id) is not None
+
+
+def random_stay(rng):
+    check_in_date = date.today() + timedelta(days=1 + rng.randrange(60))
+    return check_in_date.isoformat(), (check_in_date + timedelta(days=rng.randint(1, 5))).isoformat()
+
+
+def worker(db_name, config, ops, mix, seed, barrier, results):
+
+    database = db_base.DBbase(db_name, **config)
+    rooms = [row[0] for row in database.get_cursor.execute('SELECT room_number FROM rooms')]
+    database.get_connection.commit()
+    rng = random.Random(seed)
+    outcomes = Counter()
+    latencies = []
+    booked = []
+
+    barrier.wait()
+    start = time.monotonic()
+    for _ in range(ops):
+        action = rng.choices(('book', 'update', 'cancel'), mix)[0]
+        if action != 'book' and not booked:
+            action = 'book'
+        op_start = time.perf_counter()
+        try:
+            if action == 'book':
+                reservation_id = database.run_transaction(book, 'Front desk {}'.format(seed), rng.choice(rooms),
+                                                          *random_stay(rng))
+                if reservation_id is not None:
+                    booked.append(reservation_id)
+                done = reservation_id is not None
+            elif action == 'update':
+                done = database.run_transaction(move, rng.choice(booked), rng.choice(rooms), *random_stay(rng))
+            else:
+                done = database.run_transaction(cancel, booked.pop(rng.randrange(len(booked))))
+            outcomes['{} {}'.format(action, 'ok' if done else 'conflict')] += 1
+        except sqlite3.OperationalError as e:
+            if not db_base.is_lock_error(e):
+                raise
+            outcomes['{} locked'.format(action)] += 1
+        latencies.append(time.perf_counter() - op_start)
+    results.put({'start': start, 'end': time.monotonic(), 'outcomes': dict(outcomes), 'latencies': latencies,
+                 'lock_stats': database.lock_stats.as_dict()})
+    database.close_db()
+
+
+def prepare_database(source, tmp_dir, journal_mode, extra_rooms):
+    db_name = os.path.join(tmp_dir, 'hotel_reservation.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+    shutil.copy(source, db_name)
+    with sqlite3.connect(db_name) as conn:
+        # older copies get the current schema (cust_id, indexes) that the booking statements expect
+        hotel_db.create_tables(conn)
+        conn.execute('PRAGMA journal_mode = {}'.format(journal_mode))
+        # more rooms than the sample data so that bookings spread out instead of all conflicting
+        conn.executemany('INSERT OR IGNORE INTO rooms(room_number, room_type, rate, available) VALUES (?, ?, ?, 1)',
+                         [(1000 + number, 'Double room', 100) for number in range(extra_rooms)])
+    conn.close()
+    return db_name
+
+
+def run(db_name, config, processes, ops, mix, seed):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    with sqlite3.connect(db_name) as conn:
+        last_id_before = conn.execute('SELECT COALESCE(MAX(reservation_id), 0) FROM reservations').fetchone()[0]
+    conn.close()
+    workers = [context.Process(target=worker, args=(db_name, config, ops, mix, seed + number, barrier, results))
+               for number in range(processes)]
+    for process in workers:
+        process.start()
+    reports = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    with sqlite3.connect(db_name) as conn:
+        double_bookings = conn.execute(OVERLAPPING_PAIRS, (last_id_before,)).fetchone()[0]
+    conn.close()
+
+    elapsed = max(report['end'] for report in reports) - min(report['start'] for report in reports)
+    latencies = sorted(latency for report in reports for latency in report['latencies'])
+    outcomes = Counter()
+    lock_stats = Counter()
+    max_lock_wait_ms = 0.0
+    for report in reports:
+        outcomes.update(report['outcomes'])
+        max_lock_wait_ms = max(max_lock_wait_ms, report['lock_stats'].pop('max_lock_wait_ms'))
+        lock_stats.update(report['lock_stats'])
+    return {
+        'processes': processes,
+        'ops': len(latencies),
+        'ops_per_sec': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p99_ms': round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000, 3),
+        'avg_lock_wait_ms': round(lock_stats['lock_wait_ms'] / max(lock_stats['transactions'], 1), 3),
+        'max_lock_wait_ms': max_lock_wait_ms,
+        'retries': lock_stats['retries'],
+        'failures': lock_stats['failures'],
+        'outcomes': dict(sorted(outcomes.items())),
+        'double_bookings': double_bookings,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Multi-process booking contention test for hotel_reservation.db.')
+    parser.add_argument('--processes', default='1,2,4,8,16', help='comma separated process counts')
+    parser.add_argument('--ops', type=int, default=200, help='operations per process')
+    parser.add_argument('--mix', default='60,20,20', help='weights of book, update and cancel operations')
+    parser.add_argument('--configs', default=','.join(CONFIGS), help='comma separated names from: ' + ', '.join(CONFIGS))
+    parser.add_argument('--rooms', type=int, default=200, help='rooms added to the copy of the database')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', default=os.path.join(HERE, 'hotel_reservation.db'))
+    parser.add_argument('--output', help='JSON file to write the results to')
+    args = parser.parse_args(argv)
+
+    process_counts = [int(count) for count in args.processes.split(',')]
+    mix = [float(weight) for weight in args.mix.split(',')]
+    names = args.configs.split(',')
+    for name in names:
+        if name not in CONFIGS:
+            parser.error('unknown config {!r}'.format(name))
+
+    results = {}
+    print('{:<16} {:>5} {:>9} {:>8} {:>8} {:>10} {:>10} {:>8} {:>8} {:>7}'.format(
+        'config', 'procs', 'ops/sec', 'p50 ms', 'p99 ms', 'wait ms', 'max wait', 'retries', 'failed', 'double'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names:
+            config = CONFIGS[name]
+            results[name] = []
+            for processes in process_counts:
+                db_name = prepare_database(args.db, tmp_dir, config.get('journal_mode') or 'DELETE', args.rooms)
+                result = run(db_name, config, processes, args.ops, mix, args.seed)
+                results[name].append(result)
+                print('{:<16} {:>5} {:>9} {:>8} {:>8} {:>10} {:>10} {:>8} {:>8} {:>7}'.format(
+                    name, processes, result['ops_per_sec'], result['p50_ms'], result['p99_ms'],
+                    result['avg_lock_wait_ms'], result['max_lock_wait_ms'], result['retries'], result['failures'],
+                    result['double_bookings']), flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'ops_per_process': args.ops, 'mix': mix, 'configs': CONFIGS, 'results': results}, file, indent=2)
+    return 1 if any(result['double_bookings'] for runs in results.values() for result in runs) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
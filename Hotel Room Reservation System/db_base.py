@@ -1,27 +1,360 @@
 
+import json
+import os
+import random
+import re
 import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+
+
+# Opt-in per-statement statistics: calls, rows, errors and a latency histogram per normalised
+# statement, plus the EXPLAIN QUERY PLAN of every statement slower than slow_query_ms
+class QueryStats:
+    # upper bounds of the latency histogram buckets in milliseconds, the last bucket is open ended
+    BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+    def __init__(self, slow_query_ms=100):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._normalised = {}
+        self._statements = {}
+        self._slow_queries = {}
+
+    # literals become '?' and whitespace is collapsed, so the same query with other values is one entry
+    @staticmethod
+    def normalise(sql):
+        sql = _STRING_LITERAL.sub("?", sql)
+        sql = _NUMBER_LITERAL.sub("?", sql)
+        return " ".join(sql.split())
+
+    def _key(self, sql):
+        key = self._normalised.get(sql)
+        if key is None:
+            key = self._normalised[sql] = self.normalise(sql)
+        return key
+
+    def record(self, sql, rows, seconds, error=False):
+        key = self._key(sql)
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                entry = self._statements[key] = {"calls": 0, "rows": 0, "errors": 0, "total_ms": 0.0,
+                                                 "max_ms": 0.0, "histogram": [0] * (len(self.BUCKETS_MS) + 1)}
+            entry["calls"] += 1
+            entry["rows"] += max(rows, 0)
+            entry["errors"] += error
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["histogram"][bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+        return key
+
+    # rows of a query are only known once they are fetched
+    def add_rows(self, key, rows):
+        with self._lock:
+            self._statements[key]["rows"] += rows
+
+    def is_slow(self, seconds):
+        return self.slow_query_ms is not None and seconds * 1000 >= self.slow_query_ms
+
+    def record_slow(self, sql, seconds, plan):
+        with self._lock:
+            self._slow_queries[self._key(sql)] = {"ms": round(seconds * 1000, 3), "plan": plan}
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow_queries.clear()
+
+    def _percentile_ms(self, histogram, fraction):
+        target = sum(histogram) * fraction
+        seen = 0
+        for bucket, count in enumerate(histogram):
+            seen += count
+            if count and seen >= target:
+                return self.BUCKETS_MS[bucket] if bucket < len(self.BUCKETS_MS) else float("inf")
+        return 0.0
+
+    # statements ordered by total time spent, the ones that dominate first
+    def as_dict(self):
+        with self._lock:
+            statements = [(key, dict(entry, histogram=list(entry["histogram"])))
+                          for key, entry in self._statements.items()]
+            slow_queries = dict(self._slow_queries)
+        labels = ["<={}ms".format(bound) for bound in self.BUCKETS_MS] + [">{}ms".format(self.BUCKETS_MS[-1])]
+        report = []
+        for key, entry in sorted(statements, key=lambda item: item[1]["total_ms"], reverse=True):
+            report.append({
+                "statement": key,
+                "calls": entry["calls"],
+                "rows": entry["rows"],
+                "errors": entry["errors"],
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["calls"], 4),
+                "max_ms": round(entry["max_ms"], 3),
+                "p50_ms": self._percentile_ms(entry["histogram"], 0.50),
+                "p99_ms": self._percentile_ms(entry["histogram"], 0.99),
+                "histogram": {label: count for label, count in zip(labels, entry["histogram"]) if count},
+            })
+        return {"slow_query_ms": self.slow_query_ms, "statements": report,
+                "slow_queries": [dict(statement=key, **value) for key, value in slow_queries.items()]}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.as_dict(), indent=indent)
+
+    def report(self, limit=20):
+        data = self.as_dict()
+        lines = ["{:>8} {:>10} {:>7} {:>11} {:>9} {:>9} {:>9}  statement".format(
+            "calls", "rows", "errors", "total ms", "avg ms", "p99 ms", "max ms")]
+        for entry in data["statements"][:limit]:
+            lines.append("{calls:>8} {rows:>10} {errors:>7} {total_ms:>11.2f} {avg_ms:>9.3f} {p99_ms:>9} {max_ms:>9.2f}"
+                         "  {statement}".format(**entry))
+        for slow in data["slow_queries"]:
+            lines.append("")
+            lines.append("slow ({} ms): {}".format(slow["ms"], slow["statement"]))
+            for step in slow["plan"] or ():
+                lines.append("    " + step)
+        return "\n".join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _stats_key = None
+
+    def _timed(self, run, sql, parameters=None):
+        stats = self.connection.stats
+        if stats is None:
+            return run()
+        start = time.perf_counter()
+        try:
+            run()
+        except sqlite3.Error:
+            stats.record(sql, 0, time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        self._stats_key = stats.record(sql, self.rowcount, elapsed)
+        if stats.is_slow(elapsed):
+            stats.record_slow(sql, elapsed, self.connection.explain(sql, parameters))
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._timed(lambda: super(InstrumentedCursor, self).execute(sql, parameters), sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(lambda: super(InstrumentedCursor, self).executemany(sql, seq_of_parameters), sql)
+
+    def executescript(self, sql_script):
+        return self._timed(lambda: super(InstrumentedCursor, self).executescript(sql_script), sql_script)
+
+    def _count(self, rows):
+        if self._stats_key is not None and self.connection.stats is not None and self.rowcount < 0:
+            self.connection.stats.add_rows(self._stats_key, rows)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows))
+        return rows
+
+
+# Connection whose statements are timed into `stats` while it is set (None keeps it switched off)
+class InstrumentedConnection(sqlite3.Connection):
+    stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    # EXPLAIN QUERY PLAN of a single statement, None when it cannot be explained
+    def explain(self, sql, parameters=None):
+        if parameters is None:
+            return None
+        try:
+            rows = sqlite3.Connection.execute(self, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error:
+            return None
+        return [row[-1] for row in rows]
+
+
+# Prepared statements kept per connection for reuse, keyed by SQL text (sqlite3's default is 128)
+CACHED_STATEMENTS = 256
+
+
+# Opens a connection that can be shared between DBbase objects and plain module functions.
+# db_name is a file name, ':memory:' or a 'file:' URI such as 'file:hotel?mode=memory&cache=shared'
+# (an in-memory database that several connections can open by that name). journal_mode ('WAL' lets readers run alongside the writer), busy_timeout (ms to wait for a lock
+# before "database is locked") and synchronous are left at sqlite's defaults when None.
+def open_connection(db_name, cached_statements=CACHED_STATEMENTS, journal_mode=None, busy_timeout=None,
+                    synchronous=None):
+    conn = sqlite3.connect(db_name, factory=InstrumentedConnection, cached_statements=cached_statements,
+                           uri=db_name.startswith('file:'))
+    if busy_timeout is not None:
+        conn.execute('PRAGMA busy_timeout = {:d}'.format(int(busy_timeout)))
+    if journal_mode is not None:
+        conn.execute('PRAGMA journal_mode = {}'.format(journal_mode))
+    if synchronous is not None:
+        conn.execute('PRAGMA synchronous = {}'.format(synchronous))
+    return conn
+
+
+def is_lock_error(error):
+    message = str(error)
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+# Counters kept by DBbase.run_transaction: how long transactions waited for the write lock,
+# how often they were retried after "database is locked" and how many gave up
+class LockStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.retries = 0
+        self.failures = 0
+        self.lock_wait_seconds = 0.0
+        self.max_lock_wait_seconds = 0.0
+
+    def record_wait(self, seconds):
+        self.lock_wait_seconds += seconds
+        self.max_lock_wait_seconds = max(self.max_lock_wait_seconds, seconds)
+
+    def as_dict(self):
+        return {'transactions': self.transactions, 'retries': self.retries, 'failures': self.failures,
+                'lock_wait_ms': round(self.lock_wait_seconds * 1000, 3),
+                'max_lock_wait_ms': round(self.max_lock_wait_seconds * 1000, 3)}
+
 
 class DBbase:
 
     _conn = None
     _cursor = None
 
-    def __init__(self, db_name):
+    # pass conn to share an existing connection (and its statement cache) instead of opening another;
+    # journal_mode, busy_timeout and synchronous only apply to a connection opened here.
+    # run_transaction retries a transaction that hit "database is locked" up to `retries` times,
+    # sleeping a random time of up to backoff_ms * 2 ** attempt (at most max_backoff_ms) in between.
+    def __init__(self, db_name, conn=None, cached_statements=CACHED_STATEMENTS, journal_mode=None,
+                 busy_timeout=None, synchronous=None, retries=0, backoff_ms=10, max_backoff_ms=1000):
         self._db_name = db_name
-        self.connect()
+        self._cached_statements = cached_statements
+        self._journal_mode = journal_mode
+        self._busy_timeout = busy_timeout
+        self._synchronous = synchronous
+        self.retries = retries
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.lock_stats = LockStats()
+        self._owns_conn = conn is None
+        if conn is None:
+            self.connect()
+        else:
+            self._conn = conn
+            self._cursor = conn.cursor()
 
     def connect(self):
-        self._conn = sqlite3.connect(self._db_name)
+        self._conn = open_connection(self._db_name, self._cached_statements, self._journal_mode,
+                                     self._busy_timeout, self._synchronous)
         self._cursor = self._conn.cursor()
 
+    # Runs function(cursor, *args) in a BEGIN IMMEDIATE transaction and commits it. The write lock
+    # is taken up front, so a transaction never fails half way on a lock; lock errors are retried
+    # with backoff, anything else rolls back and is raised.
+    def run_transaction(self, function, *args):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                self._cursor.execute('BEGIN IMMEDIATE')
+                self.lock_stats.record_wait(time.perf_counter() - start)
+                result = function(self._cursor, *args)
+                self._conn.commit()
+                self.lock_stats.transactions += 1
+                return result
+            except BaseException as e:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                if not is_lock_error(e):
+                    raise
+                if attempt >= self.retries:
+                    self.lock_stats.failures += 1
+                    raise
+                self.lock_stats.retries += 1
+                time.sleep(random.uniform(0, min(self.backoff_ms * 2 ** attempt, self.max_backoff_ms)) / 1000)
+                attempt += 1
+
+    # opt-in statement instrumentation; pass a QueryStats to share it with other connections
+    def enable_query_stats(self, slow_query_ms=100, stats=None):
+        self._conn.stats = stats or QueryStats(slow_query_ms)
+        return self._conn.stats
+
+    def disable_query_stats(self):
+        self._conn.stats = None
+
+    @property
+    def query_stats(self):
+        return self._conn.stats
+
     def execute_script(self, sql_string):
         self._cursor.executescript(sql_string)
 
+    # Copies the whole database to the file at path through the backup API. The copy is written next
+    # to it and renamed over it, so path always holds a complete database; nothing may have it open.
+    def snapshot(self, path):
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            self._conn.backup(target)
+        finally:
+            target.close()
+        # journal files left over from the old file would be applied to the new one
+        for suffix in ('-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.replace(tmp_path, path)
+
+    # Replaces the contents of this database with the snapshot (or any database file) at path
+    def restore(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self._conn.commit()
+        source = sqlite3.connect(path)
+        try:
+            source.backup(self._conn)
+        finally:
+            source.close()
+
     def reset_database(self):
         raise NotImplementedError("Must implement from the derived class")
 
+    # a shared connection is left open for its owner to close
     def close_db(self):
-        self._conn.close()
+        if self._owns_conn:
+            self._conn.close()
 
     @property
     def get_cursor(self):
@@ -0,0 +1,301 @@
+# Schema and statement-level steps of the hotel database. Unlike hotel_room_reservation, importing
+# this module opens no database and loads nothing, so the reservation service, the load and
+# contention tests and other tools can share the same SQL on connections of their own.
+import sqlite3
+from collections import namedtuple
+from datetime import date
+
+# Bumped whenever create_tables changes the schema; stored in PRAGMA user_version so that
+# startup skips the DDL on a database that is already up to date
+SCHEMA_VERSION = 4
+
+# Rooms are numbered floor * 100 + n (101 is the first room on floor 1)
+ROOM_FLOOR = '(room_number / 100)'
+
+# Full name as stored in reservations.customer_name; an expression index makes exact lookups cheap
+CUSTOMER_FULL_NAME = "(first_name || ' ' || last_name)"
+
+RESERVATION_COLUMNS = 'reservation_id, customer_name, room_number, check_in_date, check_out_date, total_cost, cust_id'
+
+# AUTOINCREMENT keeps the highest id ever handed out in sqlite_sequence, so the id of a cancelled or
+# archived reservation is never given to a new booking (see raise_reservation_id_floor)
+RESERVATIONS_TABLE = '''CREATE TABLE IF NOT EXISTS {}
+                 (reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  customer_name TEXT NOT NULL,
+                  room_number INTEGER NOT NULL,
+                  check_in_date TEXT NOT NULL,
+                  check_out_date TEXT NOT NULL,
+                  total_cost INTEGER NOT NULL,
+                  cust_id INTEGER REFERENCES Customer(cust_id),
+                  FOREIGN KEY(room_number) REFERENCES rooms(room_number))'''
+
+# The schema version is kept in the database header, reading it costs no query on the tables
+def schema_is_current(connection):
+    return connection.execute('''PRAGMA user_version''').fetchone()[0] >= SCHEMA_VERSION
+
+# Creating tables for database
+def create_tables(connection):
+    if schema_is_current(connection):
+        return
+    cursor = connection.cursor()
+    # available only marks a room out of service for the room listings; bookings never change it,
+    # whether a room is free for some dates is decided by the overlapping stays alone
+    cursor.execute('''CREATE TABLE IF NOT EXISTS rooms
+                 (room_number INTEGER PRIMARY KEY,
+                  room_type TEXT NOT NULL,
+                  rate INTEGER NOT NULL,
+                  available BOOL NOT NULL)''')
+
+    cursor.execute(RESERVATIONS_TABLE.format('reservations'))
+    migrate_reservations_to_autoincrement(connection)
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Customer(
+                 cust_id INTEGER PRIMARY KEY NOT NULL,
+                 first_name TEXT NOT NULL,
+                 last_name TEXT NOT NULL,
+                 dob date NOT NULL,
+                 phone int(12) NOT NULL )''')
+
+    # stays are looked up by room and by the dates they end/start; check_out_date leads so that
+    # past stays (check_out_date before the requested check-in) are skipped by the index
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_reservations_room_dates
+                 ON reservations(room_number, check_out_date, check_in_date)''')
+
+    # room searches by availability, type, rate range and floor are answered from these indexes alone
+    # (room_number is the rowid, so every index carries it)
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_rooms_available ON rooms(available, room_type, rate)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_rooms_type_rate ON rooms(room_type, rate, available)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_rooms_rate ON rooms(available, rate, room_type)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_rooms_floor ON rooms(''' + ROOM_FLOOR + ''', available, room_type, rate)''')
+
+    connection.commit()
+
+    migrate_reservations_to_customers(connection)
+    create_customer_search(connection)
+    create_archive_table(connection)
+    clear_booking_flags(connection)
+
+    connection.execute('''PRAGMA user_version = {:d}'''.format(SCHEMA_VERSION))
+    connection.commit()
+
+# Links reservations to Customer.cust_id: adds the column and its indexes to older databases and
+# backfills it for rows whose customer_name matches exactly one customer's full name.
+# Returns the number of reservations linked.
+def migrate_reservations_to_customers(connection):
+    cursor = connection.cursor()
+    columns = [row[1] for row in cursor.execute('''PRAGMA table_info(reservations)''')]
+    if 'cust_id' not in columns:
+        cursor.execute('''ALTER TABLE reservations ADD COLUMN cust_id INTEGER REFERENCES Customer(cust_id)''')
+
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_reservations_cust_id ON reservations(cust_id)''')
+    # reservations nobody could be linked to are still found by name, without scanning the linked ones
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_reservations_unlinked_name
+                      ON reservations(customer_name COLLATE NOCASE) WHERE cust_id IS NULL''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_customer_full_name
+                      ON Customer(''' + CUSTOMER_FULL_NAME + ''' COLLATE NOCASE)''')
+
+    unlinked = '''SELECT COUNT(*) FROM reservations WHERE cust_id IS NULL'''
+    before = cursor.execute(unlinked).fetchone()[0]
+    cursor.execute('''UPDATE reservations SET cust_id = (
+                          SELECT MIN(cust_id) FROM Customer
+                          WHERE ''' + CUSTOMER_FULL_NAME + ''' = reservations.customer_name COLLATE NOCASE
+                          HAVING COUNT(*) = 1)
+                      WHERE cust_id IS NULL''')
+    linked = before - cursor.execute(unlinked).fetchone()[0]
+    connection.commit()
+    return linked
+
+# Before schema version 4 every booking cleared its room's available flag and moving or cancelling
+# did not always set it again, nor did archiving; rooms that have current or archived stays are put
+# back in service. Returns the number of rooms changed.
+def clear_booking_flags(connection):
+    changed = connection.execute('''UPDATE rooms SET available = 1 WHERE available = 0
+                                    AND room_number IN (SELECT room_number FROM reservations
+                                                        UNION SELECT room_number FROM reservations_archive)''').rowcount
+    connection.commit()
+    return changed
+
+# Customer id for an exact (case-insensitive) full name, None if unknown or ambiguous
+def find_customer_id(cursor, customer_name):
+    rows = cursor.execute('''SELECT cust_id FROM Customer
+                             WHERE ''' + CUSTOMER_FULL_NAME + ''' = ? COLLATE NOCASE LIMIT 2''',
+                          (customer_name.strip(),)).fetchall()
+    return rows[0][0] if len(rows) == 1 else None
+
+# FTS5 index over customer names, kept in sync with the Customer table by triggers.
+# Returns False when this SQLite build has no FTS5; search_customers then falls back to LIKE.
+def create_customer_search(connection):
+    try:
+        connection.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS customer_search USING fts5(
+                first_name, last_name, content='Customer', content_rowid='cust_id');
+            CREATE TRIGGER IF NOT EXISTS customer_search_insert AFTER INSERT ON Customer BEGIN
+                INSERT INTO customer_search(rowid, first_name, last_name)
+                VALUES (new.cust_id, new.first_name, new.last_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS customer_search_delete AFTER DELETE ON Customer BEGIN
+                INSERT INTO customer_search(customer_search, rowid, first_name, last_name)
+                VALUES ('delete', old.cust_id, old.first_name, old.last_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS customer_search_update AFTER UPDATE ON Customer BEGIN
+                INSERT INTO customer_search(customer_search, rowid, first_name, last_name)
+                VALUES ('delete', old.cust_id, old.first_name, old.last_name);
+                INSERT INTO customer_search(rowid, first_name, last_name)
+                VALUES (new.cust_id, new.first_name, new.last_name);
+            END;''')
+    except sqlite3.OperationalError:
+        return False
+    # customers added before the index existed
+    indexed = connection.execute('''SELECT COUNT(*) FROM customer_search_docsize''').fetchone()[0]
+    if indexed != connection.execute('''SELECT COUNT(*) FROM Customer''').fetchone()[0]:
+        connection.execute("INSERT INTO customer_search(customer_search) VALUES ('rebuild')")
+        connection.commit()
+    return True
+
+# Rebuilds a reservations table created without AUTOINCREMENT, keeping every id. Without it SQLite
+# hands out MAX(reservation_id) + 1, which is an already archived id once the newest stays are gone.
+def migrate_reservations_to_autoincrement(connection):
+    sql = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'reservations'").fetchone()[0]
+    if 'AUTOINCREMENT' in sql.upper():
+        return False
+    # older tables may not have cust_id yet, migrate_reservations_to_customers adds it afterwards
+    columns = ', '.join(row[1] for row in connection.execute('''PRAGMA table_info(reservations)'''))
+    connection.execute(RESERVATIONS_TABLE.format('reservations_autoincrement'))
+    connection.execute('''INSERT INTO reservations_autoincrement ({0}) SELECT {0} FROM reservations'''.format(columns))
+    connection.execute('''DROP TABLE reservations''')
+    connection.execute('''ALTER TABLE reservations_autoincrement RENAME TO reservations''')
+    connection.commit()
+    return True
+
+# Table for completed stays, in the main database or in an attached one (schema 'archive')
+def create_archive_table(connection, schema='main'):
+    connection.execute('''CREATE TABLE IF NOT EXISTS {}.reservations_archive
+                    (reservation_id INTEGER PRIMARY KEY,
+                     customer_name TEXT NOT NULL,
+                     room_number INTEGER NOT NULL,
+                     check_in_date TEXT NOT NULL,
+                     check_out_date TEXT NOT NULL,
+                     total_cost INTEGER NOT NULL,
+                     cust_id INTEGER)'''.format(schema))
+    raise_reservation_id_floor(connection, schema)
+    connection.commit()
+
+# Makes new reservation ids start above every id in the archive: archived stays leave the hot table,
+# and an archive attached from its own file may hold ids this database has never seen
+def raise_reservation_id_floor(connection, schema='main'):
+    floor = connection.execute('''SELECT COALESCE(MAX(reservation_id), 0) FROM {}.reservations_archive'''
+                               .format(schema)).fetchone()[0]
+    if connection.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'reservations'",
+                          (floor,)).rowcount == 0 and floor:
+        connection.execute('''INSERT INTO sqlite_sequence(name, seq) VALUES ('reservations', ?)''', (floor,))
+
+# Two stays overlap when each one starts before the other one ends. The check-out day of one
+# stay can be the check-in day of the next one.
+OVERLAPPING_RESERVATION = '''SELECT 1 FROM reservations
+                             WHERE reservations.room_number = rooms.room_number
+                             AND reservations.check_out_date > ?
+                             AND reservations.check_in_date < ?'''
+
+# Result of insert_group_reservation / book_group, reservation_ids and room_numbers in the same order
+GroupBooking = namedtuple('GroupBooking', ['reservation_ids', 'room_numbers', 'total_cost'])
+
+# Statement-level steps of the reservation functions in hotel_room_reservation. They take the cursor to run
+# on and leave committing to the caller, so the reservation service can run them inside its own transactions.
+
+def insert_reservation(cursor, customer_name, room_number, check_in_date, check_out_date, total_cost, cust_id=None):
+    if cust_id is None:
+        cust_id = find_customer_id(cursor, customer_name)
+    cursor.execute('''INSERT INTO reservations(customer_name, room_number, check_in_date, check_out_date, total_cost, cust_id)
+                      VALUES (?, ?, ?, ?, ?, ?)''',
+                   (customer_name, room_number, check_in_date, check_out_date, total_cost, cust_id))
+    return cursor.lastrowid
+
+def move_reservation(cursor, reservation_id, room_number, check_in_date, check_out_date, total_cost):
+    # Update the reservation record in the database
+    cursor.execute(
+        '''UPDATE reservations SET room_number = ?, check_in_date = ?, check_out_date = ?, total_cost = ? WHERE reservation_id = ?''',
+        (room_number, check_in_date, check_out_date, total_cost, reservation_id))
+    return cursor.rowcount > 0
+
+# Returns the room number of the deleted reservation, or None if there was no such reservation
+def remove_reservation(cursor, reservation_id):
+    # Get the room number of the reservation to delete
+    row = cursor.execute('''SELECT room_number FROM reservations WHERE reservation_id = ?''', (reservation_id,)).fetchone()
+    if row is None:
+        return None
+    room_number = row[0]
+
+    # Delete the reservation record from the database
+    cursor.execute('''DELETE FROM reservations WHERE reservation_id = ?''', (reservation_id,))
+    return room_number
+
+# Same test as check_availability, run on the given cursor. When moving an existing reservation
+# pass its id, so the reservation does not conflict with itself.
+def room_is_free(cursor, room_number, check_in_date, check_out_date, reservation_id=None):
+    row = cursor.execute(
+        '''SELECT NOT EXISTS(SELECT 1 FROM reservations
+                                 WHERE reservations.room_number = rooms.room_number
+                                 AND reservations.check_out_date > ?
+                                 AND reservations.check_in_date < ?
+                                 AND reservations.reservation_id IS NOT ?)
+           FROM rooms WHERE room_number = ?''',
+        (check_in_date, check_out_date, reservation_id, room_number)).fetchone()
+    return row is not None and bool(row[0])
+
+# Id of a stay in the room that overlaps the dates (other than reservation_id), None if there is none;
+# tells a date clash apart from a room that does not exist
+def overlapping_stay(cursor, room_number, check_in_date, check_out_date, reservation_id=None):
+    row = cursor.execute('''SELECT reservation_id FROM reservations
+                             WHERE room_number = ? AND check_out_date > ? AND check_in_date < ?
+                             AND reservation_id IS NOT ? LIMIT 1''',
+                         (room_number, check_in_date, check_out_date, reservation_id)).fetchone()
+    return row[0] if row else None
+
+# The first rooms_wanted free rooms of a type for a date range, with their rates, in one query
+GROUP_FREE_ROOMS = '''SELECT room_number, rate FROM rooms
+                      WHERE room_type = ?
+                      AND NOT EXISTS(''' + OVERLAPPING_RESERVATION + ''')
+                      ORDER BY room_number LIMIT ?'''
+
+# Stays inserted after reservation_id ? that overlap any other stay of the same room
+GROUP_CONFLICTS = '''SELECT COUNT(*) FROM reservations AS booked
+                     JOIN reservations AS other ON other.room_number = booked.room_number
+                     AND other.reservation_id <> booked.reservation_id
+                     AND other.check_out_date > booked.check_in_date
+                     AND other.check_in_date < booked.check_out_date
+                     WHERE booked.reservation_id > ?'''
+
+# Books rooms_wanted rooms of one type for the same dates: the rooms are picked by one set-based
+# query and inserted with one executemany. Returns None when there are not enough free rooms or
+# one of them was taken in the meantime; the caller then has to roll back, since some of the
+# group may already be inserted. Run it inside a BEGIN IMMEDIATE transaction.
+def insert_group_reservation(cursor, customer_name, room_type, rooms_wanted, check_in_date, check_out_date, cust_id=None):
+    num_nights = (date.fromisoformat(check_out_date) - date.fromisoformat(check_in_date)).days
+    if rooms_wanted < 1 or num_nights < 1:
+        return None
+    rooms = cursor.execute(GROUP_FREE_ROOMS, (room_type, check_in_date, check_out_date, rooms_wanted)).fetchall()
+    if len(rooms) < rooms_wanted:
+        return None
+    if cust_id is None:
+        cust_id = find_customer_id(cursor, customer_name)
+
+    last_id = cursor.execute('''SELECT COALESCE(MAX(reservation_id), 0) FROM reservations''').fetchone()[0]
+    cursor.executemany('''INSERT INTO reservations(customer_name, room_number, check_in_date, check_out_date, total_cost, cust_id)
+                          VALUES (?, ?, ?, ?, ?, ?)''',
+                       [(customer_name, room_number, check_in_date, check_out_date, num_nights * rate, cust_id)
+                        for room_number, rate in rooms])
+    if cursor.execute(GROUP_CONFLICTS, (last_id,)).fetchone()[0]:
+        return None
+
+    booked = cursor.execute('''SELECT reservation_id, room_number FROM reservations WHERE reservation_id > ?
+                               ORDER BY reservation_id''', (last_id,)).fetchall()
+    return GroupBooking([row[0] for row in booked], [row[1] for row in booked],
+                        sum(num_nights * rate for _, rate in rooms))
+
+# Same price as calculate_cost, looked up by room number on the given cursor
+def stay_cost(cursor, room_number, check_in_date, check_out_date):
+    row = cursor.execute('''SELECT rate FROM rooms WHERE room_number = ?''', (room_number,)).fetchone()
+    if row is None:
+        return None
+    num_nights = (date.fromisoformat(check_out_date) - date.fromisoformat(check_in_date)).days
+    return num_nights * row[0]
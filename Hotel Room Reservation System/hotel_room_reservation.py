@@ -1,21 +1,48 @@
 # Import statements
-import sqlite3
-from datetime import datetime
+from datetime import date, datetime
 import db_base as db
 import csv
 import os
-
-# Connection to the database
-conn = sqlite3.connect('hotel_reservation.db')
+import time
+from collections import namedtuple
+from itertools import islice
+from availability_calendar import AvailabilityCalendar
+from pricing_engine import PricingEngine
+import hotel_db
+from hotel_db import (OVERLAPPING_RESERVATION, RESERVATION_COLUMNS, ROOM_FLOOR, find_customer_id,
+                      insert_group_reservation, insert_reservation, move_reservation, remove_reservation, room_is_free)
+
+# The database can be chosen with the HOTEL_DB environment variable, e.g. HOTEL_DB=:memory: for
+# tests and simulations; Customer.snapshot()/restore() copy it to and from a file
+DB_NAME = os.environ.get('HOTEL_DB', 'hotel_reservation.db')
+
+# One connection to the database, shared by Customer and the reservation functions, so every
+# statement is prepared once and then reused from the connection's statement cache
+conn = db.open_connection(DB_NAME)
 c = conn.cursor()
 
+# Optional in-memory availability calendar, see enable_availability_calendar()
+calendar = None
+
+# Optional cached pricing engine, see enable_pricing_engine()
+pricing = None
+
+# Summary returned by Customer.load_csv
+CustomerLoadReport = namedtuple('CustomerLoadReport', ['loaded', 'rejected', 'rejected_rows', 'elapsed', 'rows_per_sec'])
+
+# Summary returned by load_rooms
+RoomLoadReport = namedtuple('RoomLoadReport', ['inserted', 'updated', 'unchanged', 'rejected', 'rejected_rows', 'elapsed'])
+
+
 # Customer Class
 class Customer(db.DBbase):
-    def __init__(self, db_name):
-        super().__init__(db_name)
+    def __init__(self, db_name, conn=None):
+        super().__init__(db_name, conn)
         self.create_table()
 
     def create_table(self):
+        if schema_is_current(self.get_connection):
+            return
         sql = """
         CREATE TABLE IF NOT EXISTS Customer (
             cust_id INTEGER PRIMARY KEY NOT NULL,
@@ -35,75 +62,395 @@ class Customer(db.DBbase):
         return self.get_cursor.lastrowid
 
     def add_to_db(self):
-        # Open CSV file and read rows
+        # Load customer.csv in batches
         csv_file = os.path.join(os.path.dirname(__file__), 'customer.csv')
-        with open(csv_file, 'r') as file:
-            reader = csv.reader(file)
-            # Skip header row
-            next(reader)
-            # Iterate over rows and insert into table
-            for row1 in reader:
-                cust_id, first_name, last_name, dob, phone = row1
-                self.add_customer(cust_id, first_name, last_name, dob, phone)
+        self.load_csv(csv_file)
         print('Data from customer.csv file has been added to the database')
 
-Customer = Customer('hotel_reservation.db')
+    # Checks and converts one CSV row: dob becomes an ISO date (YYYY-MM-DD), phone an integer
+    @staticmethod
+    def validate_customer(row):
+        if len(row) != 5:
+            raise ValueError('expected 5 fields, got {}'.format(len(row)))
+        cust_id, first_name, last_name, dob, phone = (field.strip() for field in row)
+        try:
+            cust_id = int(cust_id)
+        except ValueError:
+            raise ValueError('invalid cust_id {!r}'.format(cust_id)) from None
+        if not first_name or not last_name:
+            raise ValueError('missing first or last name')
+        try:
+            # M/D/YYYY as exported in customer.csv (split by hand, strptime is slow), or already ISO
+            if '/' in dob:
+                month, day, year = dob.split('/')
+                dob = date(int(year), int(month), int(day)).isoformat()
+            else:
+                dob = date.fromisoformat(dob).isoformat()
+        except ValueError:
+            raise ValueError('invalid dob {!r}'.format(dob)) from None
+        digits = ''.join(ch for ch in phone if ch not in '-. ()+')
+        if not digits.isdigit() or not 7 <= len(digits) <= 12:
+            raise ValueError('invalid phone {!r}'.format(phone))
+        return cust_id, first_name, last_name, dob, int(digits)
+
+    # Streaming bulk loader: validates each row, then inserts in executemany batches,
+    # one transaction per batch. Rows whose cust_id already exists are skipped, or
+    # overwritten when upsert=True, so loading the same file twice is harmless.
+    def load_csv(self, csv_path, batch_size=5000, upsert=False):
+        if upsert:
+            sql = """INSERT INTO Customer (cust_id, first_name, last_name, dob, phone) VALUES (?, ?, ?, ?, ?)
+                     ON CONFLICT(cust_id) DO UPDATE SET first_name = excluded.first_name,
+                     last_name = excluded.last_name, dob = excluded.dob, phone = excluded.phone"""
+        else:
+            sql = "INSERT OR IGNORE INTO Customer (cust_id, first_name, last_name, dob, phone) VALUES (?, ?, ?, ?, ?)"
+
+        loaded = 0
+        rejected_rows = []
+        start = time.perf_counter()
+        with open(csv_path, 'r', newline='') as file:
+            reader = csv.reader(file)
+            # Skip header row
+            next(reader, None)
+            rows = enumerate(reader, start=2)
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+                batch = []
+                for line_number, row in chunk:
+                    try:
+                        batch.append(self.validate_customer(row))
+                    except ValueError as e:
+                        rejected_rows.append((line_number, str(e)))
+                if not batch:
+                    continue
+                conn = self.get_connection
+                with conn:
+                    # rowcount, unlike total_changes, leaves out the customer_search rows written by triggers
+                    loaded += conn.executemany(sql, batch).rowcount
+        elapsed = time.perf_counter() - start
+        rows_per_sec = (loaded + len(rejected_rows)) / elapsed if elapsed else 0.0
+        return CustomerLoadReport(loaded, len(rejected_rows), rejected_rows, elapsed, rows_per_sec)
+
+# The schema version is kept in the database header, reading it costs no query on the tables
+def schema_is_current(connection=None):
+    return hotel_db.schema_is_current(connection or conn)
+
+Customer = Customer(DB_NAME, conn)
 Customer.add_to_db()
 
-# Creating tables for database
-def create_tables():
-    c.execute('''CREATE TABLE IF NOT EXISTS rooms
-                 (room_number INTEGER PRIMARY KEY,
-                  room_type TEXT NOT NULL,
-                  rate INTEGER NOT NULL,
-                  available BOOL NOT NULL)''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS reservations
-                 (reservation_id INTEGER PRIMARY KEY,
-                  customer_name TEXT NOT NULL,
-                  room_number INTEGER NOT NULL,
-                  check_in_date TEXT NOT NULL,
-                  check_out_date TEXT NOT NULL,
-                  total_cost INTEGER NOT NULL,
-                  FOREIGN KEY(room_number) REFERENCES rooms(room_number))''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS Customer(
-                 cust_id INTEGER PRIMARY KEY NOT NULL,
-                 first_name TEXT NOT NULL,
-                 last_name TEXT NOT NULL,
-                 dob date NOT NULL,
-                 phone int(12) NOT NULL )''')
+# Opt-in statement instrumentation for the module connection and the Customer connection.
+# Read the results with query_stats.report() or query_stats.to_json().
+def enable_query_stats(slow_query_ms=100):
+    conn.stats = Customer.enable_query_stats(slow_query_ms)
+    return conn.stats
+
+def disable_query_stats():
+    conn.stats = None
+    Customer.disable_query_stats()
 
+# Creating tables for database, see hotel_db.create_tables
+def create_tables(connection=None):
+    hotel_db.create_tables(connection or conn)
+
+# ---- Room inventory ----
+
+# Checks and converts one rooms.csv row: room_number, room_type, rate[, available]
+def validate_room(row):
+    if len(row) not in (3, 4):
+        raise ValueError('expected 3 or 4 fields, got {}'.format(len(row)))
+    room_number, room_type, rate = (field.strip() for field in row[:3])
+    try:
+        room_number = int(room_number)
+    except ValueError:
+        raise ValueError('invalid room_number {!r}'.format(room_number)) from None
+    if room_number <= 0:
+        raise ValueError('invalid room_number {!r}'.format(room_number))
+    if not room_type:
+        raise ValueError('missing room_type')
+    try:
+        rate = float(rate.lstrip('$'))
+    except ValueError:
+        raise ValueError('invalid rate {!r}'.format(rate)) from None
+    if rate < 0:
+        raise ValueError('invalid rate {!r}'.format(rate))
+    available = row[3].strip().lower() if len(row) == 4 else '1'
+    if available not in ('1', '0', 'true', 'false', 'yes', 'no', ''):
+        raise ValueError('invalid available {!r}'.format(row[3]))
+    return room_number, room_type, int(rate) if rate.is_integer() else rate, int(available in ('1', 'true', 'yes', ''))
+
+# Idempotent bulk room loader: new rooms are inserted, rooms whose type or rate changed are updated, in
+# executemany batches of batch_size rows, one transaction per batch. The available flag of an existing
+# room is left alone, it tracks bookings. Unchanged rooms are not written at all, so reloading the same
+# file is cheap and leaves the pricing cache valid.
+def load_rooms(csv_path=None, batch_size=5000):
+    csv_path = csv_path or os.path.join(os.path.dirname(__file__), 'rooms.csv')
+    sql = '''INSERT INTO rooms(room_number, room_type, rate, available) VALUES (?, ?, ?, ?)
+             ON CONFLICT(room_number) DO UPDATE SET room_type = excluded.room_type, rate = excluded.rate
+             WHERE rooms.room_type IS NOT excluded.room_type OR rooms.rate IS NOT excluded.rate'''
+    inserted = updated = unchanged = 0
+    rejected_rows = []
+    start = time.perf_counter()
+    with open(csv_path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        # Skip header row
+        next(reader, None)
+        rows = enumerate(reader, start=2)
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            batch = []
+            for line_number, row in chunk:
+                try:
+                    batch.append(validate_room(row))
+                except ValueError as e:
+                    rejected_rows.append((line_number, str(e)))
+            rooms_before = c.execute('''SELECT COUNT(*) FROM rooms''').fetchone()[0]
+            c.executemany(sql, batch)
+            # rowcount counts inserts and updates (not the rows touched by triggers)
+            changed = c.rowcount
+            added = c.execute('''SELECT COUNT(*) FROM rooms''').fetchone()[0] - rooms_before
+            conn.commit()
+            inserted += added
+            updated += changed - added
+            unchanged += len(batch) - changed
+    if calendar is not None and inserted + updated:
+        calendar.load(conn.cursor())
+    return RoomLoadReport(inserted, updated, unchanged, len(rejected_rows), rejected_rows, time.perf_counter() - start)
+
+# Function to search rooms by type, rate range and floor; every filter is optional
+def search_rooms(room_type=None, min_rate=None, max_rate=None, floor=None, available_only=True):
+    sql = '''SELECT room_number, room_type, rate FROM rooms WHERE 1'''
+    params = []
+    if available_only:
+        sql += ''' AND available = 1'''
+    if room_type is not None:
+        sql += ''' AND room_type = ?'''
+        params.append(room_type)
+    if min_rate is not None:
+        sql += ''' AND rate >= ?'''
+        params.append(min_rate)
+    if max_rate is not None:
+        sql += ''' AND rate <= ?'''
+        params.append(max_rate)
+    if floor is not None:
+        sql += ''' AND ''' + ROOM_FLOOR + ''' = ?'''
+        params.append(floor)
+    return c.execute(sql + ''' ORDER BY room_number''', params).fetchall()
+
+def _has_customer_search(cursor):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'customer_search'").fetchone() is not None
+
+# FTS5 query matching every word of the text as a prefix of a first or last name
+def _prefix_query(text):
+    words = [word.replace('"', '') for word in text.split()]
+    return ' '.join('"{}"*'.format(word) for word in words if word)
+
+# Function to search customers by (partial) first and/or last name, e.g. "chas jen"
+def search_customers(text, limit=20, cursor=None):
+    cursor = cursor or c
+    query = _prefix_query(text)
+    if not query:
+        return []
+    if _has_customer_search(cursor):
+        return cursor.execute('''SELECT Customer.* FROM customer_search
+                                 JOIN Customer ON Customer.cust_id = customer_search.rowid
+                                 WHERE customer_search MATCH ? ORDER BY rank LIMIT ?''', (query, limit)).fetchall()
+    sql = '''SELECT * FROM Customer WHERE 1'''
+    params = []
+    for word in text.split():
+        sql += ''' AND (first_name LIKE ? OR last_name LIKE ?)'''
+        params += [word + '%', word + '%']
+    return cursor.execute(sql + ''' LIMIT ?''', params + [limit]).fetchall()
+
+# Function to find the reservations of a guest by exact (case-insensitive) full name: those linked
+# to the customer of that name, plus any not yet linked reservation booked under that name.
+# Partial names are for search_customers, not for picking a reservation to change or cancel.
+def find_reservations(customer_name, cursor=None):
+    cursor = cursor or c
+    cust_id = find_customer_id(cursor, customer_name)
+    reservations = []
+    if cust_id is not None:
+        reservations = cursor.execute('''SELECT * FROM reservations WHERE cust_id = ? ORDER BY reservation_id''',
+                                      (cust_id,)).fetchall()
+    reservations += cursor.execute('''SELECT * FROM reservations
+                                      WHERE cust_id IS NULL AND customer_name = ? COLLATE NOCASE
+                                      ORDER BY reservation_id''', (customer_name.strip(),)).fetchall()
+    return reservations
+
+# ---- Archive of completed stays ----
+# Stays that checked out before today are moved out of reservations into reservations_archive, so
+# the hot table (and every availability check on it) only holds current and future bookings.
+
+# Schema the archive lives in: 'main', or 'archive' once attach_archive() has been called
+archive_schema = 'main'
+
+# Keeps the archive in a separate database file instead of the main one
+def attach_archive(archive_db):
+    global archive_schema
     conn.commit()
+    conn.execute('''ATTACH DATABASE ? AS archive''', (archive_db,))
+    archive_schema = 'archive'
+    create_archive_table()
+
+def create_archive_table(connection=None):
+    hotel_db.create_archive_table(connection or conn, archive_schema)
+
+# Moves completed stays (check_out_date before `before`, default today) into the archive,
+# batch_size rows per transaction. Returns the number of reservations archived.
+def archive_reservations(before=None, batch_size=5000):
+    before = before or date.today().isoformat()
+    create_archive_table()
+    archive = '{}.reservations_archive'.format(archive_schema)
+    archived = 0
+    last_id = 0
+    while True:
+        # walks the table in reservation_id order, so the whole job reads it once; ids are never
+        # reused (AUTOINCREMENT, see hotel_db.raise_reservation_id_floor), so any stay can be moved
+        ids = [row[0] for row in c.execute('''SELECT reservation_id FROM reservations
+                                                WHERE reservation_id > ? AND check_out_date < ?
+                                                ORDER BY reservation_id LIMIT ?''', (last_id, before, batch_size))]
+        if not ids:
+            break
+        # the batch is exactly the completed stays between its first and last id; a plain INSERT, so an
+        # id that is already archived fails loudly instead of overwriting the stay stored under it
+        batch = (ids[0], ids[-1], before)
+        c.execute('''INSERT INTO {} ({cols}) SELECT {cols} FROM reservations
+                     WHERE reservation_id BETWEEN ? AND ? AND check_out_date < ?'''.format(archive, cols=RESERVATION_COLUMNS),
+                  batch)
+        c.execute('''DELETE FROM reservations WHERE reservation_id BETWEEN ? AND ? AND check_out_date < ?''', batch)
+        conn.commit()
+        if calendar is not None:
+            for reservation_id in ids:
+                calendar.cancel(reservation_id)
+        archived += len(ids)
+        last_id = ids[-1]
+    return archived
+
+# Pages of reservations in reservation_id order, read with keyset pagination (WHERE reservation_id > last)
+# so that every page costs the same however deep into the history it is
+def iter_reservation_pages(page_size=20, after_id=0, archived=False):
+    if archived:
+        table = '{}.reservations_archive'.format(archive_schema)
+    else:
+        table = 'reservations'
+    while True:
+        page = conn.execute('''SELECT {} FROM {} WHERE reservation_id > ?
+                               ORDER BY reservation_id LIMIT ?'''.format(RESERVATION_COLUMNS, table),
+                            (after_id, page_size)).fetchall()
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1][0]
+
+# Prints reservations page by page, fetching the next page only when the user asks for it
+def print_reservation_pages(pages, page_size):
+    shown = 0
+    for page_number, page in enumerate(pages, start=1):
+        print('--------- Page {} ---------'.format(page_number))
+        for reservation in page:
+            print(
+                f'Reservation ID: {reservation[0]} - Customer Name: {reservation[1]} - Room Number: {reservation[2]} - Check-In Date: {reservation[3]} - Check-Out Date: {reservation[4]} - Total Cost: ${reservation[5]}')
+        shown += len(page)
+        if len(page) == page_size and input("Press Enter for the next page or 'q' to stop: ").lower() == 'q':
+            break
+    return shown
+
+# Loads the availability calendar once; afterwards the reservation functions keep it up to date,
+# it is reloaded when another connection commits, and availability checks inside the cached window
+# are answered from memory
+def enable_availability_calendar(horizon_days=730):
+    global calendar
+    calendar = AvailabilityCalendar(horizon_days).load(conn.cursor())
+    return calendar
+
+def disable_availability_calendar():
+    global calendar
+    calendar = None
+
+# Compares the calendar with the database, returns the room numbers that differ
+def check_calendar_consistency():
+    if calendar is None:
+        return []
+    return calendar.verify(conn.cursor())
+
+# The calendar, reloaded first if bookings were committed by other connections since it was loaded
+def fresh_calendar():
+    if calendar is not None:
+        calendar.refresh(conn.cursor())
+    return calendar
 
 # Function to check available rooms for booking
 def check_availability(room_number, check_in_date, check_out_date):
     try:
 
-        c.execute('''SELECT available FROM rooms WHERE room_number = ?''', (room_number,))
-        available = c.fetchone()[0]
+        if fresh_calendar() is not None:
+            available = calendar.is_available(room_number, check_in_date, check_out_date)
+            if available is not None:
+                return available
 
-        c.execute('''SELECT EXISTS(SELECT 1 FROM reservations
-                                     WHERE room_number = ?
-                                     AND ((check_in_date <= ? AND check_out_date >= ?)
-                                          OR (check_in_date >= ? AND check_in_date <= ?)))''',
-                  (room_number, check_in_date, check_in_date, check_in_date, check_out_date))
-        reserved = c.fetchone()[0]
+        c.execute('''SELECT NOT EXISTS(''' + OVERLAPPING_RESERVATION + ''')
+                     FROM rooms WHERE room_number = ?''',
+                  (check_in_date, check_out_date, room_number))
+        row = c.fetchone()
 
-        if not available:
-            return False
-        elif reserved:
+        if row is None:
             return False
         else:
-            return True
+            return bool(row[0])
+
+    except Exception as e:
+            print("An error has occurred : {}".format(e))
+
+# Function to find every room that is free for a date range, in one query
+def find_available_rooms(check_in_date, check_out_date, room_type=None):
+    try:
+
+        if fresh_calendar() is not None:
+            rooms = calendar.available_rooms(check_in_date, check_out_date, room_type)
+            if rooms is not None:
+                return rooms
+
+        sql = '''SELECT room_number, room_type, rate FROM rooms
+                 WHERE NOT EXISTS(''' + OVERLAPPING_RESERVATION + ''')'''
+        params = [check_in_date, check_out_date]
+        if room_type is not None:
+            sql += ''' AND room_type = ?'''
+            params.append(room_type)
+
+        c.execute(sql + ''' ORDER BY room_number''', params)
+        return c.fetchall()
 
     except Exception as e:
             print("An error has occurred : {}".format(e))
 
+# Function to look up the type of a room
+def get_room_type(room_number):
+    if fresh_calendar() is not None and calendar.room_type(room_number) is not None:
+        return calendar.room_type(room_number)
+    return c.execute('''SELECT room_type FROM rooms WHERE room_number = ?''', (room_number,)).fetchone()[0]
+
+# Caches room rates and precomputes the nightly rate calendar for calculate_cost.
+# Options (weekend_multiplier, seasons, ...) are passed on to PricingEngine.
+def enable_pricing_engine(**options):
+    global pricing
+    pricing = PricingEngine(conn, **options)
+    return pricing
+
+def disable_pricing_engine():
+    global pricing
+    pricing = None
+
 # Function to calculate the total cost after reservation
 def calculate_cost(room_type, check_in_date, check_out_date):
     try:
 
+        if pricing is not None:
+            return pricing.quote(room_type, check_in_date, check_out_date)
+
         c.execute('''SELECT rate FROM rooms WHERE room_type = ?''', (room_type,))
         rate = c.fetchone()[0]
 
@@ -117,39 +464,60 @@ def calculate_cost(room_type, check_in_date, check_out_date):
     except Exception as e:
             print("An error has occurred : {}".format(e))
 
-# Function to make a new reservation
-def make_reservation(customer_name, room_number, check_in_date, check_out_date, total_cost):
-    # try:
-
-        c.execute('''INSERT INTO reservations(customer_name, room_number, check_in_date, check_out_date, total_cost)
-                     VALUES (?, ?, ?, ?, ?)''', (customer_name, room_number, check_in_date, check_out_date, total_cost))
-
-        c.execute('''UPDATE rooms SET available = 0 WHERE room_number = ?''', (room_number,))
+# Function to make a new reservation. The room is checked again under the write lock, since the
+# earlier check_availability may be out of date; returns None when it has been taken meanwhile.
+def make_reservation(customer_name, room_number, check_in_date, check_out_date, total_cost, cust_id=None):
+        c.execute('''BEGIN IMMEDIATE''')
+        try:
+            if not room_is_free(c, room_number, check_in_date, check_out_date):
+                conn.rollback()
+                return None
+            reservation_id = insert_reservation(c, customer_name, room_number, check_in_date, check_out_date,
+                                                total_cost, cust_id)
+        except BaseException:
+            conn.rollback()
+            raise
         conn.commit()
 
+        if calendar is not None:
+            calendar.book(reservation_id, room_number, check_in_date, check_out_date)
+        return reservation_id
+
     # except Exception as e:
     #         print("An error has occurred : {}".format(e))
 
 
-# Function to update the existing reservation
-def update_reservation(reservation_id, room_number, check_in_date, check_out_date, total_cost):
+# Function to book several rooms of one type for a group, all or nothing. Returns a hotel_db.GroupBooking,
+# or None (with nothing booked) when not enough rooms of that type are free for the dates.
+def book_group(customer_name, room_type, rooms_wanted, check_in_date, check_out_date, cust_id=None):
+    c.execute('''BEGIN IMMEDIATE''')
     try:
+        booking = insert_group_reservation(c, customer_name, room_type, rooms_wanted, check_in_date, check_out_date,
+                                           cust_id)
+    except BaseException:
+        conn.rollback()
+        raise
+    if booking is None:
+        conn.rollback()
+        return None
+    conn.commit()
 
-        # Update the reservation record in the database
-        c.execute(
-            '''UPDATE reservations SET room_number = ?, check_in_date = ?, check_out_date = ?, total_cost = ? WHERE reservation_id = ?''',
-            (room_number, check_in_date, check_out_date, total_cost, reservation_id))
+    if calendar is not None:
+        for reservation_id, room_number in zip(booking.reservation_ids, booking.room_numbers):
+            calendar.book(reservation_id, room_number, check_in_date, check_out_date)
+    return booking
 
-        # Update the available status of the previously reserved room
-        c.execute(
-            '''UPDATE rooms SET available = 1 WHERE room_number = (SELECT room_number FROM reservations WHERE reservation_id = ?)''',
-            (reservation_id,))
 
-        # Update the available status of the newly reserved room
-        c.execute('''UPDATE rooms SET available = 0 WHERE room_number = ?''', (room_number,))
+# Function to update the existing reservation
+def update_reservation(reservation_id, room_number, check_in_date, check_out_date, total_cost):
+    try:
 
+        found = move_reservation(c, reservation_id, room_number, check_in_date, check_out_date, total_cost)
         conn.commit()
 
+        if calendar is not None and found:
+            calendar.move(reservation_id, room_number, check_in_date, check_out_date)
+
     except Exception as e:
             print("An error has occurred : {}".format(e))
 
@@ -157,18 +525,14 @@ def update_reservation(reservation_id, room_number, check_in_date, check_out_dat
 def delete_reservation(reservation_id):
     try:
 
-        # Get the room number of the reservation to delete4
-        c.execute('''SELECT room_number FROM reservations WHERE reservation_id = ?''', (reservation_id,))
-        room_number = c.fetchone()[0]
-
-        # Update the available status of the room
-        c.execute('''UPDATE rooms SET available = 1 WHERE room_number = ?''', (room_number,))
-
-        # Delete the reservation record from the database
-        c.execute('''DELETE FROM reservations WHERE reservation_id = ?''', (reservation_id,))
-
+        room_number = remove_reservation(c, reservation_id)
         conn.commit()
 
+        if room_number is None:
+            print("An error has occurred : reservation {} not found".format(reservation_id))
+        elif calendar is not None:
+            calendar.cancel(reservation_id)
+
     except Exception as e:
             print("An error has occurred : {}".format(e))
 
@@ -184,14 +548,15 @@ def user_menu():
             print('3. Update Reservation')
             print('4. Delete Reservation')
             print('5. View Reservations')
-            print('6. Exit')
+            print('6. Make a Group Reservation')
+            print('7. Search Customers')
+            print('8. Exit')
             print('Enter your choice:')
 
             choice = input()
 
             if choice == '1':
-                c.execute('''SELECT room_number, room_type, rate FROM rooms WHERE available = 1''')
-                available_rooms = c.fetchall()
+                available_rooms = search_rooms()
 
                 if not available_rooms:
                     print('No rooms are currently available.')
@@ -203,8 +568,7 @@ def user_menu():
             elif choice == '2':
                 customer_name = input('Please enter your name: ')
 
-                c.execute('''SELECT room_number, room_type, rate FROM rooms WHERE available = 1''')
-                available_rooms = c.fetchall()
+                available_rooms = search_rooms()
 
                 if not available_rooms:
                     print('No rooms are currently available.')
@@ -219,7 +583,7 @@ def user_menu():
                     check_out_date = input('Please enter your check-out date (YYYY-MM-DD): ')
 
                     if check_availability(room_number, check_in_date, check_out_date):
-                        room_type = c.execute('''SELECT room_type FROM rooms WHERE room_number = ?''', (room_number,)).fetchone()[0]
+                        room_type = get_room_type(room_number)
                         total_cost = calculate_cost(room_type, check_in_date, check_out_date)
 
                         print(f'The total cost for your reservation is: ${total_cost}')
@@ -227,8 +591,11 @@ def user_menu():
                         confirm = input('Would you like to confirm your reservation? (y/n): ')
 
                         if confirm.lower() == 'y':
-                            make_reservation(customer_name, room_number, check_in_date, check_out_date, total_cost)
-                            print('Wohoo!! Your reservation confirmed!')
+                            if make_reservation(customer_name, room_number, check_in_date, check_out_date,
+                                                total_cost) is None:
+                                print('Sorry!, the room has just been booked by someone else.')
+                            else:
+                                print('Wohoo!! Your reservation confirmed!')
                         else:
                             print('Sorry, Your Reservation is canceled.')
 
@@ -238,8 +605,7 @@ def user_menu():
             elif choice == '3':
                 customer_name = input('Please enter your name: ')
 
-                c.execute('''SELECT * FROM reservations WHERE customer_name = ?''', (customer_name,))
-                reservations = c.fetchall()
+                reservations = find_reservations(customer_name)
 
                 if not reservations:
                     print('****Sorry! No reservations found under that name****.')
@@ -266,7 +632,7 @@ def user_menu():
                             check_out_date = input('Please enter your new check-out date (YYYY-MM-DD): ')
 
                             if check_availability(room_number, check_in_date, check_out_date):
-                                room_type = c.execute('''SELECT room_type FROM rooms WHERE room_number = ?''', (room_number,)).fetchone()[0]
+                                room_type = get_room_type(room_number)
                                 total_cost = calculate_cost(room_type, check_in_date, check_out_date)
 
                                 print(f'The total cost for your updated reservation is: ${total_cost}')
@@ -289,8 +655,7 @@ def user_menu():
 
                 customer_name = input('Please enter the customer name: ')
 
-                c.execute('''SELECT * FROM reservations WHERE customer_name = ?''', (customer_name,))
-                reservations = c.fetchall()
+                reservations = find_reservations(customer_name)
 
                 if not reservations:
                     print('No reservations found under that name.')
@@ -311,18 +676,48 @@ def user_menu():
                     print('Your reservation is not cancelled.')
 
             elif choice == '5':
-                c.execute('''SELECT * FROM reservations ''')
-                reservations = c.fetchall()
-                if not reservations:
+                if not print_reservation_pages(iter_reservation_pages(page_size=20), 20):
                     print('***** No reservations found *****.')
 
-                else:
-                    print('Your Reservations:')
-                    for reservation in reservations:
-                        print(
-                            f'Reservation ID: {reservation[0]} - Customer Name: {reservation[1]} - Room Number: {reservation[2]} - Check-In Date: {reservation[3]} - Check-Out Date: {reservation[4]} - Total Cost: ${reservation[5]}')
+                if input('Would you like to see past stays too? (y/n): ').lower() == 'y':
+                    if not print_reservation_pages(iter_reservation_pages(page_size=20, archived=True), 20):
+                        print('***** No past stays found *****.')
 
             elif choice == '6':
+                customer_name = input('Please enter the group name: ')
+                room_type = input('Please enter the room type: ')
+                rooms_wanted = int(input('How many rooms would you like to reserve? '))
+                check_in_date = input('Please enter the check-in date (YYYY-MM-DD): ')
+                check_out_date = input('Please enter the check-out date (YYYY-MM-DD): ')
+
+                free_rooms = find_available_rooms(check_in_date, check_out_date, room_type) or []
+                if len(free_rooms) < rooms_wanted:
+                    print(f'Sorry!, only {len(free_rooms)} rooms of that type are available for the selected dates.')
+                else:
+                    num_nights = (date.fromisoformat(check_out_date) - date.fromisoformat(check_in_date)).days
+                    total_cost = sum(room[2] * num_nights for room in free_rooms[:rooms_wanted])
+                    print(f'The total cost for {rooms_wanted} rooms is: ${total_cost}')
+
+                    if input('Would you like to confirm the group reservation? (y/n): ').lower() == 'y':
+                        booking = book_group(customer_name, room_type, rooms_wanted, check_in_date, check_out_date)
+                        if booking is None:
+                            print('Sorry!, the rooms were taken in the meantime. Nothing has been reserved.')
+                        else:
+                            print('Wohoo!! Your group reservation is confirmed for rooms {}!'.format(
+                                ', '.join(str(room_number) for room_number in booking.room_numbers)))
+                    else:
+                        print('Sorry, Your Reservation is canceled.')
+
+            elif choice == '7':
+                customers = search_customers(input('Please enter the name or the start of it: '))
+
+                if not customers:
+                    print('No customers found.')
+                else:
+                    for customer in customers:
+                        print(f'Customer ID: {customer[0]} - Name: {customer[1]} {customer[2]} - Phone: {customer[4]}')
+
+            elif choice == '8':
                 print('***** Thank you for using the Hotel Room Reservation System!*****')
                 break
 
@@ -330,41 +725,18 @@ def user_menu():
                 print('Invalid choice. Please choose again.')
 
 
-# Function to add data for rooms before reservations
-# We can also do this with the help of a csv file. We can add this data to rooms.csv file,
-# read the data from it and add it to the rooms table in the database.
-
+# Function to add data for rooms before reservations, from rooms.csv; safe to run on every start
 def populate_data():
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (101, 'Single room', 50, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (102, 'Single room', 50, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (103, 'Single room', 50, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (104, 'Single room', 50, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (105, 'Double room', 100, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (106, 'Double room', 100, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (107, 'Double room', 100, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (108, 'Double room', 100, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (109, 'Penthouse Suite', 300, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (110, 'Penthouse Suite', 300, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (111, 'Penthouse Suite', 300, 1)''')
-    c.execute('''INSERT INTO rooms(room_number, room_type, rate, available)
-                 VALUES (112, 'Penthouse Suite', 300, 1)''')
-
-    conn.commit()
+    report = load_rooms()
+    for line_number, error in report.rejected_rows:
+        print('rooms.csv line {}: {}'.format(line_number, error))
 
 # Main function
 if __name__ == '__main__':
     create_tables()
     populate_data()
+    archive_reservations()
+    enable_availability_calendar()
+    enable_pricing_engine()
     user_menu()
     conn.close()
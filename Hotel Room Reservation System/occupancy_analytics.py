@@ -0,0 +1,196 @@
+# Occupancy and revenue analytics per room type and night.
+# Reservations (and archived stays) are read joined to rooms in one streaming pass. Each stay adds
+# +1 room and its nightly revenue on its first night and takes them off again on its check-out date,
+# a sweep line over per type difference arrays. Running sums over the nights then give rooms sold
+# and revenue for every night, so the work is O(reservations + nights x room types) instead of one
+# availability check per room and date.
+#
+#   occupancy % = rooms sold / rooms * 100
+#   ADR         = revenue / rooms sold       (average daily rate)
+#   RevPAR      = revenue / rooms            (revenue per available room)
+#
+# usage: python occupancy_analytics.py [--db hotel_reservation.db] [--from YYYY-MM-DD] [--days 91]
+#                                      [--csv report.csv] [--columnar report.json.gz | report.npz]
+import argparse
+import csv
+import gzip
+import json
+import sqlite3
+import sys
+from datetime import date, timedelta
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only needed for .npz exports
+    np = None
+
+# line added to every night with the figures over all room types
+ALL_ROOMS = 'All rooms'
+
+STAYS = '''SELECT rooms.room_type, stays.check_in_date, stays.check_out_date, stays.total_cost
+           FROM ({}) AS stays JOIN rooms ON rooms.room_number = stays.room_number
+           WHERE stays.check_out_date > ? AND stays.check_in_date < ?'''
+
+CSV_HEADER = ['night', 'room_type', 'rooms', 'rooms_sold', 'occupancy_pct', 'revenue', 'adr', 'revpar']
+
+
+class OccupancyReport:
+    def __init__(self, first_night, nights, room_counts):
+        self.first_night = first_night
+        self.nights = nights
+        self.room_counts = room_counts             # room_type -> number of rooms
+        self.room_types = sorted(room_counts)
+        self.sold = {}                             # room_type -> rooms sold per night
+        self.revenue = {}                          # room_type -> revenue per night
+
+    def night(self, index):
+        return self.first_night + timedelta(days=index)
+
+    def occupancy_pct(self, room_type, index):
+        rooms = self._rooms(room_type)
+        return round(self.sold[room_type][index] * 100 / rooms, 2) if rooms else 0.0
+
+    def adr(self, room_type, index):
+        sold = self.sold[room_type][index]
+        return round(self.revenue[room_type][index] / sold, 2) if sold else 0.0
+
+    def revpar(self, room_type, index):
+        rooms = self._rooms(room_type)
+        return round(self.revenue[room_type][index] / rooms, 2) if rooms else 0.0
+
+    def _rooms(self, room_type):
+        if room_type == ALL_ROOMS:
+            return sum(self.room_counts.values())
+        return self.room_counts[room_type]
+
+    # one tuple per night and room type (plus ALL_ROOMS), in CSV_HEADER order
+    def rows(self):
+        for index in range(self.nights):
+            night = self.night(index).isoformat()
+            for room_type in self.room_types + [ALL_ROOMS]:
+                yield (night, room_type, self._rooms(room_type), self.sold[room_type][index],
+                       self.occupancy_pct(room_type, index), round(self.revenue[room_type][index], 2),
+                       self.adr(room_type, index), self.revpar(room_type, index))
+
+    def to_csv(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(self.rows())
+
+    # one array per measure and room type instead of one line per night: a .npz file when the name
+    # ends in .npz (needs numpy), otherwise JSON, gzip compressed when the name ends in .gz
+    def to_columnar(self, path):
+        room_types = self.room_types + [ALL_ROOMS]
+        if path.endswith('.npz'):
+            if np is None:
+                raise RuntimeError('numpy is required for .npz exports')
+            np.savez_compressed(path, first_night=np.array(self.first_night.isoformat()),
+                                room_types=np.array(room_types),
+                                rooms=np.array([self._rooms(room_type) for room_type in room_types]),
+                                sold=np.array([self.sold[room_type] for room_type in room_types], dtype=np.int32),
+                                revenue=np.array([self.revenue[room_type] for room_type in room_types]))
+            return
+        data = {
+            'first_night': self.first_night.isoformat(),
+            'nights': self.nights,
+            'room_types': room_types,
+            'rooms': [self._rooms(room_type) for room_type in room_types],
+            'sold': [list(self.sold[room_type]) for room_type in room_types],
+            'revenue': [[round(value, 2) for value in self.revenue[room_type]] for room_type in room_types],
+        }
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt') as file:
+            json.dump(data, file, separators=(',', ':'))
+
+
+def _stay_sources(conn):
+    sources = ['SELECT room_number, check_in_date, check_out_date, total_cost FROM reservations']
+    for schema in ('main', 'archive'):
+        try:
+            found = conn.execute("SELECT 1 FROM {}.sqlite_master WHERE name = 'reservations_archive'".format(schema)).fetchone()
+        except sqlite3.OperationalError:  # no archive database attached
+            continue
+        if found:
+            sources.append('SELECT room_number, check_in_date, check_out_date, total_cost '
+                           'FROM {}.reservations_archive'.format(schema))
+    return ' UNION ALL '.join(sources)
+
+
+# figures for the nights first_night .. first_night + nights - 1; first_night is a date or ISO string
+def occupancy_report(conn, first_night, nights):
+    if isinstance(first_night, str):
+        first_night = date.fromisoformat(first_night)
+    end_night = first_night + timedelta(days=nights)
+    room_counts = dict(conn.execute('SELECT room_type, COUNT(*) FROM rooms GROUP BY room_type'))
+    report = OccupancyReport(first_night, nights, room_counts)
+
+    sold_delta = {room_type: [0] * (nights + 1) for room_type in room_counts}
+    revenue_delta = {room_type: [0.0] * (nights + 1) for room_type in room_counts}
+    # the same dates come up again and again, each one is parsed once
+    offsets = {}
+    base = first_night.toordinal()
+
+    def offset(day):
+        value = offsets.get(day)
+        if value is None:
+            value = offsets[day] = date.fromisoformat(day).toordinal() - base
+        return value
+
+    cursor = conn.execute(STAYS.format(_stay_sources(conn)), (first_night.isoformat(), end_night.isoformat()))
+    while True:
+        stays = cursor.fetchmany(10000)
+        if not stays:
+            break
+        for room_type, check_in_date, check_out_date, total_cost in stays:
+            first = offset(check_in_date)
+            end = offset(check_out_date)
+            if end <= first:
+                continue
+            # the stay's cost is spread evenly over its nights, only the nights inside the window count
+            nightly = total_cost / (end - first)
+            first = max(first, 0)
+            end = min(end, nights)
+            sold = sold_delta[room_type]
+            revenue = revenue_delta[room_type]
+            sold[first] += 1
+            sold[end] -= 1
+            revenue[first] += nightly
+            revenue[end] -= nightly
+
+    for room_type in room_counts:
+        report.sold[room_type] = list(accumulate(sold_delta[room_type][:nights]))
+        report.revenue[room_type] = list(accumulate(revenue_delta[room_type][:nights]))
+    report.sold[ALL_ROOMS] = [sum(night) for night in zip(*(report.sold[t] for t in room_counts))] or [0] * nights
+    report.revenue[ALL_ROOMS] = [sum(night) for night in zip(*(report.revenue[t] for t in room_counts))] or [0.0] * nights
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Occupancy, ADR and RevPAR per room type and night.')
+    parser.add_argument('--db', default='hotel_reservation.db')
+    parser.add_argument('--from', dest='first_night', default=date.today().isoformat(),
+                        help='first night of the report (default: today)')
+    parser.add_argument('--days', type=int, default=91, help='number of nights (default: a quarter)')
+    parser.add_argument('--csv', help='write one line per night and room type to this CSV file')
+    parser.add_argument('--columnar', help='write the columns to a .json, .json.gz or .npz file')
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        report = occupancy_report(conn, args.first_night, args.days)
+    finally:
+        conn.close()
+    if args.csv:
+        report.to_csv(args.csv)
+    if args.columnar:
+        report.to_columnar(args.columnar)
+    if not args.csv and not args.columnar:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(report.rows())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# Pricing engine for room quotes.
+# Rates are read from the rooms table once and cached; triggers on rooms bump a version counter so
+# the cache is reloaded only when a rate or room type actually changes. Date dependent pricing
+# (weekend and seasonal multipliers) is precomputed into a nightly rate calendar stored as prefix
+# sums, so any stay is priced with two lookups instead of parsing and looping over its nights.
+from datetime import date
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, quote_many falls back to plain Python
+    np = None
+
+RATE_VERSION_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rooms_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO rooms_version (id, version) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS rooms_version_insert AFTER INSERT ON rooms
+BEGIN UPDATE rooms_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS rooms_version_update AFTER UPDATE OF room_number, room_type, rate ON rooms
+BEGIN UPDATE rooms_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS rooms_version_delete AFTER DELETE ON rooms
+BEGIN UPDATE rooms_version SET version = version + 1; END;
+'''
+
+
+class PricingEngine:
+    # weekend_nights are weekday numbers of the nights charged the weekend multiplier (Friday, Saturday)
+    # seasons is a list of (first_night, end_night, multiplier) with ISO dates, end_night excluded
+    def __init__(self, conn, weekend_multiplier=1.0, weekend_nights=(4, 5), seasons=(), calendar_days=730):
+        self.conn = conn
+        self.weekend_multiplier = weekend_multiplier
+        self.weekend_nights = frozenset(weekend_nights)
+        self.seasons = [(date.fromisoformat(first).toordinal(), date.fromisoformat(end).toordinal(), multiplier)
+                        for first, end, multiplier in seasons]
+        self.calendar_days = calendar_days
+        conn.executescript(RATE_VERSION_SCHEMA)
+        self._seen = None
+        self._version = None
+        self._rate_by_type = {}
+        self._rate_by_room = {}
+        self._type_by_room = {}
+        self._base = None
+        self._prefix = None
+        self._build_calendar(date.today().toordinal())
+
+    # ---- rate cache ----
+
+    def _refresh(self):
+        # nothing committed anywhere since the last look: the cache is still valid
+        seen = (self.conn.execute('PRAGMA data_version').fetchone()[0], self.conn.total_changes)
+        if seen == self._seen:
+            return
+        self._seen = seen
+        version = self.conn.execute('SELECT version FROM rooms_version WHERE id = 1').fetchone()[0]
+        if version == self._version:
+            return
+        self._version = version
+        self._rate_by_type.clear()
+        self._rate_by_room.clear()
+        self._type_by_room.clear()
+        for room_number, room_type, rate in self.conn.execute('SELECT room_number, room_type, rate FROM rooms'):
+            # calculate_cost charges the rate of the first room of a type
+            self._rate_by_type.setdefault(room_type, rate)
+            self._rate_by_room[room_number] = rate
+            self._type_by_room[room_number] = room_type
+
+    def rate(self, room_type):
+        self._refresh()
+        return self._rate_by_type[room_type]
+
+    def room_rate(self, room_number):
+        self._refresh()
+        return self._rate_by_room[room_number]
+
+    # ---- nightly rate calendar ----
+
+    def night_multiplier(self, ordinal):
+        multiplier = 1.0
+        if date.fromordinal(ordinal).weekday() in self.weekend_nights:
+            multiplier *= self.weekend_multiplier
+        for first, end, season_multiplier in self.seasons:
+            if first <= ordinal < end:
+                multiplier *= season_multiplier
+        return multiplier
+
+    def _build_calendar(self, first_ordinal, end_ordinal=None):
+        end_ordinal = max(end_ordinal or 0, first_ordinal + self.calendar_days)
+        self._base = first_ordinal
+        self._prefix = [0.0] + list(accumulate(self.night_multiplier(ordinal)
+                                               for ordinal in range(first_ordinal, end_ordinal)))
+        self._prefix_array = np.array(self._prefix) if np is not None else None
+
+    # the calendar grows to cover whatever range gets quoted
+    def _cover(self, first_ordinal, end_ordinal):
+        if first_ordinal < self._base or end_ordinal - self._base >= len(self._prefix):
+            self._build_calendar(min(first_ordinal, self._base), max(end_ordinal, self._base + len(self._prefix)))
+
+    # sum of the night multipliers for the stay, 1.0 per night without special pricing
+    def charged_nights(self, check_in_date, check_out_date):
+        first = date.fromisoformat(check_in_date).toordinal()
+        end = date.fromisoformat(check_out_date).toordinal()
+        if end <= first:
+            return float(end - first)
+        self._cover(first, end)
+        return self._prefix[end - self._base] - self._prefix[first - self._base]
+
+    # ---- quotes ----
+
+    def quote(self, room_type, check_in_date, check_out_date):
+        return price(self.rate(room_type), self.charged_nights(check_in_date, check_out_date))
+
+    def quote_room(self, room_number, check_in_date, check_out_date):
+        return price(self.room_rate(room_number), self.charged_nights(check_in_date, check_out_date))
+
+    # quotes many (room_number, check_in_date, check_out_date) requests in one pass
+    def quote_many(self, requests):
+        self._refresh()
+        requests = list(requests)
+        if not requests:
+            return []
+        room_numbers, check_ins, check_outs = zip(*requests)
+        rates = [self._rate_by_room[room_number] for room_number in room_numbers]
+        if np is not None:
+            return self._quote_many_numpy(rates, check_ins, check_outs)
+        firsts = [date.fromisoformat(day).toordinal() for day in check_ins]
+        ends = [date.fromisoformat(day).toordinal() for day in check_outs]
+        self._cover(min(firsts), max(ends))
+        prefix = self._prefix
+        base = self._base
+        return [price(rate, prefix[end - base] - prefix[first - base]) if end > first else price(rate, end - first)
+                for rate, first, end in zip(rates, firsts, ends)]
+
+    def _quote_many_numpy(self, rates, check_ins, check_outs):
+        epoch = date(1970, 1, 1).toordinal()
+        firsts = np.array(check_ins, dtype='datetime64[D]').astype(np.int64) + epoch
+        ends = np.array(check_outs, dtype='datetime64[D]').astype(np.int64) + epoch
+        self._cover(int(firsts.min()), int(ends.max()))
+        nights = self._prefix_array[ends - self._base] - self._prefix_array[firsts - self._base]
+        nights = np.where(ends > firsts, nights, ends - firsts)
+        totals = round_cents(np.array(rates, dtype=np.float64) * nights)
+        return [int(total) if total.is_integer() else total for total in totals.tolist()]
+
+
+# money amounts are kept to cents; whole amounts stay integers, as calculate_cost returns them
+def price(rate, charged_nights):
+    total = round(rate * charged_nights, 2)
+    return int(total) if float(total).is_integer() else total
+
+
+# rounds numpy totals to cents exactly as price() does, so batch quotes match single ones
+def round_cents(values):
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= np.abs(scaled) * 1e-12 + 1e-9
+    if near_tie.any():
+        index = np.flatnonzero(near_tie)
+        rounded[index] = [round(value, 2) for value in values[index].tolist()]
+    return rounded
@@ -0,0 +1,173 @@
+# Load test for reservation_service.py: many concurrent clients booking and cancelling rooms over
+# keep-alive HTTP connections. Afterwards the database is checked for overlapping stays in the
+# same room, which must be zero. Successful bookings are reported per second next to the raw
+# request rate, since a 409 answer is cheap and would otherwise inflate the throughput.
+#
+# By default a throwaway copy of hotel_reservation.db is made and a service is started on it:
+#   python reservation_loadtest.py --clients 100 --requests 50
+# or point it at a running service and its database file:
+#   python reservation_loadtest.py --port 8080 --db hotel_reservation.db
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+OVERLAPPING_PAIRS = '''SELECT COUNT(*) FROM reservations a JOIN reservations b
+                       ON a.room_number = b.room_number AND a.reservation_id < b.reservation_id
+                       AND a.check_out_date > b.check_in_date AND a.check_in_date < b.check_out_date
+                       WHERE b.reservation_id > ?'''
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, payload=None):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self._writer.write('{} {} HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n'
+                           'Content-Length: {}\r\n\r\n'.format(method, path, self.host, len(body)).encode() + body)
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self._reader.readexactly(length))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+async def run_client(host, port, rooms, days, num_requests, cancel_ratio, seed, stats, latencies):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    booked = []
+    first_night = date.today() + timedelta(days=1)
+    try:
+        for _ in range(num_requests):
+            start = time.perf_counter()
+            if booked and rng.random() < cancel_ratio:
+                status, _ = await client.request('DELETE', '/reservations/{}'.format(booked.pop(rng.randrange(len(booked)))))
+                stats['cancel {}'.format(status)] += 1
+            else:
+                check_in_date = first_night + timedelta(days=rng.randrange(days))
+                check_out_date = check_in_date + timedelta(days=rng.randint(1, 5))
+                status, reservation = await client.request('POST', '/reservations', {
+                    'customer_name': 'Load test {}'.format(seed),
+                    'room_number': rng.choice(rooms),
+                    'check_in_date': check_in_date.isoformat(),
+                    'check_out_date': check_out_date.isoformat(),
+                })
+                if status == 409:
+                    stats['book 409 {}'.format(reservation.get('reason'))] += 1
+                else:
+                    stats['book {}'.format(status)] += 1
+                if status == 201:
+                    booked.append(reservation['reservation_id'])
+            latencies.append(time.perf_counter() - start)
+    finally:
+        client.close()
+
+
+async def run_load(host, port, clients, num_rooms, days, num_requests, cancel_ratio):
+    status, rooms = await Client(host, port).request('GET', '/rooms')
+    room_numbers = [room['room_number'] for room in rooms][:num_rooms or None]
+    stats = Counter()
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, room_numbers, days, num_requests, cancel_ratio, seed, stats,
+                                      latencies)
+                           for seed in range(clients)))
+    return stats, latencies, time.perf_counter() - start
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_service(db_name, port):
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, 'reservation_service.py'),
+                                '--db', db_name, '--port', str(port)],
+                               cwd=os.path.dirname(db_name), stdout=subprocess.PIPE)
+    # wait for the service's own "listening" line
+    for line in process.stdout:
+        if b'listening' in line:
+            return process
+    raise RuntimeError('reservation service did not start')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent booking load test for the reservation service.')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=50, help='requests per client')
+    parser.add_argument('--cancel-ratio', type=float, default=0.3)
+    parser.add_argument('--rooms', type=int, help='book only the first ROOMS rooms (default: every room)')
+    parser.add_argument('--days', type=int, default=90, help='check-in dates are spread over this many nights')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='port of a running service (default: start one on a copy of --db)')
+    parser.add_argument('--db', default=os.path.join(HERE, 'hotel_reservation.db'))
+    args = parser.parse_args(argv)
+
+    tmp_dir = None
+    process = None
+    db_name = args.db
+    port = args.port
+    if port is None:
+        tmp_dir = tempfile.mkdtemp()
+        db_name = os.path.join(tmp_dir, 'hotel_reservation.db')
+        shutil.copy(args.db, db_name)
+        port = free_port()
+        process = start_service(db_name, port)
+
+    try:
+        with sqlite3.connect(db_name) as conn:
+            last_id_before = conn.execute('SELECT COALESCE(MAX(reservation_id), 0) FROM reservations').fetchone()[0]
+        stats, latencies, elapsed = asyncio.run(run_load(args.host, port, args.clients, args.rooms, args.days,
+                                                         args.requests, args.cancel_ratio))
+        with sqlite3.connect(db_name) as conn:
+            double_bookings = conn.execute(OVERLAPPING_PAIRS, (last_id_before,)).fetchone()[0]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    latencies.sort()
+    print('requests:        {}'.format(len(latencies)))
+    print('throughput:      {:.0f} requests/sec'.format(len(latencies) / elapsed))
+    print('bookings:        {:.0f} successful/sec'.format(stats['book 201'] / elapsed))
+    print('latency p50/p99: {:.1f} / {:.1f} ms'.format(latencies[len(latencies) // 2] * 1000,
+                                                       latencies[int(len(latencies) * 0.99)] * 1000))
+    for outcome, count in sorted(stats.items()):
+        print('{:<26} {}'.format(outcome + ':', count))
+    print('double bookings: {}'.format(double_bookings))
+    return 1 if double_bookings else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
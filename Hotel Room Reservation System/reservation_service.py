@@ -0,0 +1,311 @@
+# Local asyncio JSON/HTTP reservation service.
+# Writes run one at a time on a single writer connection, each one inside a BEGIN IMMEDIATE
+# transaction that re-checks availability before touching anything, so concurrent bookers can
+# never double-book a room. Reads are spread over a small pool of reader connections (the
+# database is switched to WAL mode so readers and the writer do not block each other).
+# A 409 answer carries the reason "dates_overlap": another stay in the room clashes with the
+# requested dates.
+#
+# Endpoints, JSON in and out:
+#   GET    /rooms
+#   GET    /rooms/available?check_in_date=YYYY-MM-DD&check_out_date=YYYY-MM-DD[&room_type=...]
+#   GET    /reservations/<id>
+#   POST   /reservations        {"customer_name", "room_number", "check_in_date", "check_out_date"}
+#   POST   /reservations/group  {"customer_name", "room_type", "rooms", "check_in_date", "check_out_date"}
+#   PUT    /reservations/<id>   {"room_number", "check_in_date", "check_out_date"}
+#   DELETE /reservations/<id>
+#
+# usage: python reservation_service.py [--db hotel_reservation.db] [--host 127.0.0.1] [--port 8080]
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+# hotel_db rather than hotel_room_reservation: that module opens and fills ./hotel_reservation.db on import
+from hotel_db import (OVERLAPPING_RESERVATION, create_tables, insert_group_reservation, insert_reservation,
+                      move_reservation, overlapping_stay, remove_reservation, room_is_free, stay_cost)
+
+
+class RequestError(Exception):
+    def __init__(self, status, message, reason=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+class ReservationService:
+    def __init__(self, db_name, readers=4, busy_timeout=5000):
+        self.db_name = db_name
+        self.busy_timeout = busy_timeout
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reservation-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='reservation-reader')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # older databases get the cust_id link and search index before the first booking
+        with sqlite3.connect(db_name) as conn:
+            create_tables(conn)
+        conn.close()
+
+    # every worker thread keeps one long-lived connection, so the reader threads form the read pool
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA busy_timeout = {:d}'.format(self.busy_timeout))
+            conn.execute('PRAGMA journal_mode = WAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        self._writer.shutdown()
+        self._readers.shutdown()
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    # ---- reads ----
+
+    def _read(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self._readers, function, *args)
+
+    def _list_rooms(self):
+        rows = self._connection().execute(
+            '''SELECT room_number, room_type, rate, available FROM rooms ORDER BY room_number''').fetchall()
+        return [{'room_number': r[0], 'room_type': r[1], 'rate': r[2], 'available': bool(r[3])} for r in rows]
+
+    # same query as find_available_rooms, on this thread's connection
+    def _available_rooms(self, check_in_date, check_out_date, room_type):
+        rows = self._connection().execute(
+            '''SELECT room_number, room_type, rate FROM rooms
+               WHERE NOT EXISTS(''' + OVERLAPPING_RESERVATION + ''')
+               AND (? IS NULL OR room_type = ?)
+               ORDER BY room_number''', (check_in_date, check_out_date, room_type, room_type)).fetchall()
+        return [{'room_number': r[0], 'room_type': r[1], 'rate': r[2]} for r in rows]
+
+    def _get_reservation(self, reservation_id):
+        row = self._connection().execute(
+            '''SELECT * FROM reservations WHERE reservation_id = ?''', (reservation_id,)).fetchone()
+        if row is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, 'reservation {} not found'.format(reservation_id))
+        return reservation_json(row)
+
+    # ---- writes: serialised on the writer thread, one BEGIN IMMEDIATE transaction each ----
+
+    def _write(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self._writer, self._in_transaction, function, *args)
+
+    def _in_transaction(self, function, *args):
+        cursor = self._connection().cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            result = function(cursor, *args)
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
+        return result
+
+    @staticmethod
+    def _check_room(cursor, room_number, check_in_date, check_out_date, reservation_id=None):
+        if room_is_free(cursor, room_number, check_in_date, check_out_date, reservation_id):
+            return
+        if overlapping_stay(cursor, room_number, check_in_date, check_out_date, reservation_id) is not None:
+            raise RequestError(HTTPStatus.CONFLICT, 'room {} is already booked for overlapping dates'.format(room_number),
+                               'dates_overlap')
+        raise RequestError(HTTPStatus.NOT_FOUND, 'room {} not found'.format(room_number))
+
+    @staticmethod
+    def _book(cursor, customer_name, room_number, check_in_date, check_out_date):
+        # re-checked inside the write lock, the caller's view of availability may be stale
+        ReservationService._check_room(cursor, room_number, check_in_date, check_out_date)
+        total_cost = stay_cost(cursor, room_number, check_in_date, check_out_date)
+        reservation_id = insert_reservation(cursor, customer_name, room_number, check_in_date, check_out_date, total_cost)
+        return {'reservation_id': reservation_id, 'customer_name': customer_name, 'room_number': room_number,
+                'check_in_date': check_in_date, 'check_out_date': check_out_date, 'total_cost': total_cost}
+
+    @staticmethod
+    def _book_group(cursor, customer_name, room_type, rooms_wanted, check_in_date, check_out_date):
+        # all or nothing: the RequestError rolls back whatever part of the group was inserted
+        booking = insert_group_reservation(cursor, customer_name, room_type, rooms_wanted, check_in_date, check_out_date)
+        if booking is None:
+            raise RequestError(HTTPStatus.CONFLICT, '{} rooms of type {} are not available for the selected dates'.format(
+                rooms_wanted, room_type))
+        return {'customer_name': customer_name, 'room_type': room_type, 'check_in_date': check_in_date,
+                'check_out_date': check_out_date, 'total_cost': booking.total_cost,
+                'reservations': [{'reservation_id': reservation_id, 'room_number': room_number}
+                                 for reservation_id, room_number in zip(booking.reservation_ids, booking.room_numbers)]}
+
+    @staticmethod
+    def _update(cursor, reservation_id, room_number, check_in_date, check_out_date):
+        if cursor.execute('''SELECT 1 FROM reservations WHERE reservation_id = ?''', (reservation_id,)).fetchone() is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, 'reservation {} not found'.format(reservation_id))
+        ReservationService._check_room(cursor, room_number, check_in_date, check_out_date, reservation_id)
+        total_cost = stay_cost(cursor, room_number, check_in_date, check_out_date)
+        move_reservation(cursor, reservation_id, room_number, check_in_date, check_out_date, total_cost)
+        row = cursor.execute('''SELECT * FROM reservations WHERE reservation_id = ?''', (reservation_id,)).fetchone()
+        return reservation_json(row)
+
+    @staticmethod
+    def _delete(cursor, reservation_id):
+        if remove_reservation(cursor, reservation_id) is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, 'reservation {} not found'.format(reservation_id))
+        return {'reservation_id': reservation_id, 'deleted': True}
+
+    # ---- routing ----
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if parts == ['rooms'] and method == 'GET':
+            return HTTPStatus.OK, await self._read(self._list_rooms)
+        if parts == ['rooms', 'available'] and method == 'GET':
+            check_in_date, check_out_date = stay_dates(query)
+            return HTTPStatus.OK, await self._read(self._available_rooms, check_in_date, check_out_date,
+                                                   query.get('room_type'))
+        if parts == ['reservations'] and method == 'POST':
+            data = json_body(body)
+            check_in_date, check_out_date = stay_dates(data)
+            customer_name = data.get('customer_name')
+            if not customer_name:
+                raise RequestError(HTTPStatus.BAD_REQUEST, 'customer_name is required')
+            reservation = await self._write(self._book, customer_name, int_field(data, 'room_number'),
+                                            check_in_date, check_out_date)
+            return HTTPStatus.CREATED, reservation
+        if parts == ['reservations', 'group'] and method == 'POST':
+            data = json_body(body)
+            check_in_date, check_out_date = stay_dates(data)
+            customer_name = data.get('customer_name')
+            room_type = data.get('room_type')
+            if not customer_name or not room_type:
+                raise RequestError(HTTPStatus.BAD_REQUEST, 'customer_name and room_type are required')
+            rooms_wanted = int_field(data, 'rooms')
+            if rooms_wanted < 1:
+                raise RequestError(HTTPStatus.BAD_REQUEST, 'rooms must be at least 1')
+            booking = await self._write(self._book_group, customer_name, room_type, rooms_wanted,
+                                        check_in_date, check_out_date)
+            return HTTPStatus.CREATED, booking
+        if len(parts) == 2 and parts[0] == 'reservations':
+            reservation_id = int_field({'reservation_id': parts[1]}, 'reservation_id')
+            if method == 'GET':
+                return HTTPStatus.OK, await self._read(self._get_reservation, reservation_id)
+            if method == 'PUT':
+                data = json_body(body)
+                check_in_date, check_out_date = stay_dates(data)
+                return HTTPStatus.OK, await self._write(self._update, reservation_id, int_field(data, 'room_number'),
+                                                        check_in_date, check_out_date)
+            if method == 'DELETE':
+                return HTTPStatus.OK, await self._write(self._delete, reservation_id)
+        raise RequestError(HTTPStatus.NOT_FOUND, 'no route for {} {}'.format(method, url.path))
+
+    # minimal HTTP/1.1 with keep-alive, enough for local clients and the load test
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                except RequestError as e:
+                    status, payload = e.status, {'error': str(e)}
+                    if e.reason is not None:
+                        payload['reason'] = e.reason
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'An error has occurred : {}'.format(e)}
+
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+                             'Connection: {}\r\n\r\n'.format(status.value, status.phrase, len(data),
+                                                             'keep-alive' if keep_alive else 'close').encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080, ready=None):
+        server = await asyncio.start_server(self.handle_client, host, port, backlog=1024)
+        async with server:
+            if ready is not None:
+                ready(server.sockets[0].getsockname()[1])
+            await server.serve_forever()
+
+
+def reservation_json(row):
+    return {'reservation_id': row[0], 'customer_name': row[1], 'room_number': row[2],
+            'check_in_date': row[3], 'check_out_date': row[4], 'total_cost': row[5], 'cust_id': row[6]}
+
+
+def json_body(body):
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, 'request body must be JSON') from None
+    if not isinstance(data, dict):
+        raise RequestError(HTTPStatus.BAD_REQUEST, 'request body must be a JSON object')
+    return data
+
+
+def int_field(data, name):
+    try:
+        return int(data[name])
+    except (KeyError, TypeError, ValueError):
+        raise RequestError(HTTPStatus.BAD_REQUEST, '{} must be an integer'.format(name)) from None
+
+
+def stay_dates(data):
+    try:
+        check_in_date = date.fromisoformat(data['check_in_date'])
+        check_out_date = date.fromisoformat(data['check_out_date'])
+    except (KeyError, TypeError, ValueError):
+        raise RequestError(HTTPStatus.BAD_REQUEST, 'check_in_date and check_out_date must be YYYY-MM-DD dates') from None
+    if check_out_date <= check_in_date:
+        raise RequestError(HTTPStatus.BAD_REQUEST, 'check_out_date must be after check_in_date')
+    return check_in_date.isoformat(), check_out_date.isoformat()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hotel reservation JSON/HTTP service.')
+    parser.add_argument('--db', default='hotel_reservation.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--readers', type=int, default=4, help='number of pooled reader connections')
+    args = parser.parse_args(argv)
+
+    service = ReservationService(args.db, args.readers)
+    try:
+        asyncio.run(service.serve(args.host, args.port,
+                                  ready=lambda port: print('Reservation service listening on {}:{}'.format(args.host, port),
+                                                           flush=True)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Benchmark: connect/close on every Company call vs. the pooled long-lived connections.
+# usage: python benchmarks/bench_company_connections.py [num_ops]
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from company_management_system import Company
+
+
+# the previous behaviour: a brand new sqlite handle for every operation
+class PerCallCompany:
+    def __init__(self, db_name):
+        self._db_name = db_name
+
+    def _run(self, sql, params):
+        conn = sqlite3.connect(self._db_name)
+        try:
+            result = conn.execute(sql, params).fetchall()
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+
+    def hire(self, emp_id, name, age, department, salary, designation, manages_num_of_emp):
+        self._run("""insert or ignore into Company(emp_id, name, age,
+                department, salary, designation, manages_num_of_emp) values (?,?,?,?,?,?,?);""",
+                  (emp_id, name, age, department, salary, designation, manages_num_of_emp))
+
+    def raise_salary(self, emp_id, salary):
+        self._run("update Company set salary = ? WHERE emp_id = ?;", (salary, emp_id))
+
+    def fire(self, emp_id):
+        self._run("delete FROM Company WHERE emp_id = ?;", (emp_id,))
+
+    def fetch_all_employee_data(self, emp_id=None):
+        return self._run("SELECT * FROM Company WHERE emp_id = ? ;", (emp_id,))
+
+    def close(self):
+        pass
+
+
+def run_workload(company, num_ops):
+    start = time.perf_counter()
+    for emp_id in range(1, num_ops + 1):
+        company.hire(emp_id, "Employee {}".format(emp_id), 30, "IT", "$5200.0", "Manager", 3)
+        company.raise_salary(emp_id, "$5720.0")
+        company.fetch_all_employee_data(emp_id)
+        company.fire(emp_id)
+    elapsed = time.perf_counter() - start
+    return num_ops * 4 / elapsed
+
+
+def main():
+    num_ops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for label, factory in (("connect per call", PerCallCompany), ("pooled connection", Company)):
+            db_name = os.path.join(tmp_dir, label.replace(" ", "_") + ".sqlite")
+            with Company(db_name) as schema, contextlib.redirect_stdout(io.StringIO()):
+                schema.reset_database()
+            company = factory(db_name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[label] = run_workload(company, num_ops)
+            company.close()
+
+    for label, ops_per_sec in results.items():
+        print("{:<20} {:>12,.0f} ops/sec".format(label, ops_per_sec))
+    print("speed-up: {:.1f}x".format(results["pooled connection"] / results["connect per call"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Memory benchmark: dict backed employee objects vs. __slots__ objects vs. the columnar EmployeeTable.
+# usage: python benchmarks/bench_employee_memory.py [num_employees]
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from company_management_system import Manager
+from employee_table import EmployeeTable
+
+DEPARTMENTS = ["IT", "HR", "Finance", "Sales", "Global Banking and Markets"]
+
+
+# the previous, dict backed layout of Manager
+class DictManager:
+    def __init__(self, emp_id, name, age, department, weekly_pay, manages_num_of_emp):
+        self.emp_id = emp_id
+        self.name = name
+        self.age = age
+        self.department = department
+        self.weekly_pay = weekly_pay
+        self.manages_num_of_emp = manages_num_of_emp
+
+
+def rows(num_employees):
+    for emp_id in range(num_employees):
+        yield (emp_id, "Employee {}".format(emp_id), 20 + emp_id % 45, DEPARTMENTS[emp_id % len(DEPARTMENTS)],
+               5200.0 + emp_id % 1000, "Manager" if emp_id % 7 else "Executive", emp_id % 20)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    roster = build()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del roster
+    return current
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = {
+        "dict objects": measure(lambda: [DictManager(e, n, a, d, s / 52, m) for e, n, a, d, s, _, m in rows(num_employees)]),
+        "__slots__ objects": measure(lambda: [Manager(e, n, a, d, s / 52, m) for e, n, a, d, s, _, m in rows(num_employees)]),
+        "EmployeeTable": measure(lambda: EmployeeTable.from_rows(rows(num_employees))),
+    }
+    for label, size in results.items():
+        print("{:<18} {:>10.1f} MiB {:>8.1f} bytes/employee".format(label, size / 2 ** 20, size / num_employees))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Seeded synthetic data generators for the company and hotel benchmarks.
+# The same seed and size always produce the same rows, so results can be compared between versions.
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = ["Chase", "Lyle", "Kristi", "Teodoor", "Ishita", "Ray", "Kylie", "Ann", "Omar", "Mei",
+               "Lars", "Priya", "Diego", "Fatima", "Noah", "Zoe", "Ivan", "Aiko", "Sam", "Nia"]
+LAST_NAMES = ["Jensen", "Reen", "Valasek", "Burrells", "Lee", "Patel", "Garcia", "Kim", "Novak", "Okafor",
+              "Silva", "Rossi", "Murphy", "Tanaka", "Cohen", "Haddad", "Larsen", "Dubois", "Khan", "Moreau"]
+DEPARTMENTS = ["IT", "HR", "Finance", "Sales", "Marketing", "Legal", "Operations", "Global Banking and Markets"]
+ROOM_TYPES = [("Single room", 50), ("Double room", 100), ("Twin room", 90), ("Family room", 160),
+              ("Junior Suite", 220), ("Penthouse Suite", 300)]
+
+
+# rows in Company column order: emp_id, name, age, department, salary, designation, manages_num_of_emp
+def employees(count, seed=0, first_emp_id=1):
+    rng = random.Random(seed)
+    for emp_id in range(first_emp_id, first_emp_id + count):
+        designation = "Executive" if rng.random() < 0.2 else "Manager"
+        weekly_pay = round(rng.uniform(600, 4000), 1)
+        salary = round(weekly_pay * 52, 2) + (100 if designation == "Executive" else 0)
+        yield (emp_id, "{} {}".format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)), rng.randint(21, 65),
+               rng.choice(DEPARTMENTS), round(salary, 2), designation, rng.randint(0, 40))
+
+
+# rows in customer.csv layout: cust_id, first_name, last_name, dob (M/D/YYYY), phone
+def customers(count, seed=0, first_cust_id=1):
+    rng = random.Random(seed)
+    for cust_id in range(first_cust_id, first_cust_id + count):
+        dob = date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 65))
+        yield (cust_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+               "{}/{}/{}".format(dob.month, dob.day, dob.year),
+               "{:03d}-{:03d}-{:04d}".format(rng.randint(200, 999), rng.randint(100, 999), rng.randint(0, 9999)))
+
+
+# rows for the rooms table: room_number (floor * 100 + n), room_type, rate, available
+def rooms(count, seed=0, rooms_per_floor=50):
+    rng = random.Random(seed)
+    for index in range(count):
+        room_type, rate = rng.choice(ROOM_TYPES)
+        floor, number = divmod(index, rooms_per_floor)
+        yield (floor + 1) * 100 + number + 1, room_type, rate, 1
+
+
+# rows for the reservations table, without reservation_id: customer_name, room_number,
+# check_in_date, check_out_date, total_cost. Stays of one room never overlap; they are laid
+# out back in time and forward from `today`, so there is both history and future bookings.
+def reservations(count, room_rows, seed=0, today=None, future_share=0.2):
+    rng = random.Random(seed)
+    room_rows = list(room_rows)
+    today = today or date.today()
+    per_room, extra = divmod(count, len(room_rows))
+    for index, (room_number, _, rate, _) in enumerate(room_rows):
+        stays = per_room + (1 if index < extra else 0)
+        future = int(stays * future_share)
+        day = today - timedelta(days=rng.randint(0, 3))
+        for _ in range(stays - future):
+            nights = rng.randint(1, 7)
+            check_out = day - timedelta(days=rng.randint(0, 3))
+            check_in = check_out - timedelta(days=nights)
+            day = check_in
+            yield ("{} {}".format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)), room_number,
+                   check_in.isoformat(), check_out.isoformat(), nights * rate)
+        day = today + timedelta(days=rng.randint(0, 3))
+        for _ in range(future):
+            nights = rng.randint(1, 7)
+            check_in = day + timedelta(days=rng.randint(0, 3))
+            check_out = check_in + timedelta(days=nights)
+            day = check_out
+            yield ("{} {}".format(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)), room_number,
+                   check_in.isoformat(), check_out.isoformat(), nights * rate)
+
+
+# random (check_in_date, check_out_date) pairs within the next `days` days
+def stay_dates(count, seed=0, today=None, days=180, max_nights=7):
+    rng = random.Random(seed)
+    today = today or date.today()
+    for _ in range(count):
+        check_in = today + timedelta(days=rng.randrange(days))
+        yield check_in.isoformat(), (check_in + timedelta(days=rng.randint(1, max_nights))).isoformat()
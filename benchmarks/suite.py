@@ -0,0 +1,187 @@
+# Benchmark suite for the company and hotel systems.
+# Seeds throwaway databases with synthetic data at the requested scale, times the real entry points
+# and writes ops/sec, p50/p99 latency and peak RSS as JSON, so runs can be compared between versions.
+#
+# usage: python benchmarks/suite.py [--scale 100000] [--ops 2000] [--seed 0] [--output results.json]
+#                                   [--only company|hotel] [--with-caches]
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOTEL_DIR = os.path.join(ROOT, "Hotel Room Reservation System")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generators
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+# calls function(*args) for every args tuple and reports throughput and latency percentiles;
+# with is_rejected, calls whose result it accepts are counted apart from the successful ones
+def measure(function, calls, is_rejected=None):
+    latencies = []
+    rejected = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for args in calls:
+            call_start = time.perf_counter()
+            result = function(*args)
+            latencies.append(time.perf_counter() - call_start)
+            if is_rejected is not None and is_rejected(result):
+                rejected += 1
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    results = {
+        "ops": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    if is_rejected is not None:
+        results["successful"] = len(latencies) - rejected
+        results["rejected"] = rejected
+        results["successful_per_sec"] = round((len(latencies) - rejected) / elapsed, 1) if elapsed else None
+    return results
+
+
+def company_benchmarks(tmp_dir, scale, ops, seed):
+    from company_management_system import Company
+
+    results = {}
+    rng = random.Random(seed)
+    with Company(os.path.join(tmp_dir, "company.sqlite")) as company:
+        with contextlib.redirect_stdout(io.StringIO()):
+            company.reset_database()
+        company.hire_many(generators.employees(scale, seed))
+
+        new_hires = list(generators.employees(ops, seed + 1, first_emp_id=scale + 1))
+        results["Company.hire"] = measure(company.hire, new_hires)
+        results["Company.raise_salary"] = measure(
+            company.raise_salary, [(rng.randint(1, scale), round(rng.uniform(30000, 200000), 2)) for _ in range(ops)])
+        results["Company.fetch_all_employee_data(emp_id)"] = measure(
+            company.fetch_all_employee_data, [(rng.randint(1, scale),) for _ in range(ops)])
+        results["Company.fetch_all_employee_data()"] = measure(company.fetch_all_employee_data, [()] * 3)
+        results["Company.fire"] = measure(company.fire, [(row[0],) for row in new_hires])
+    return results
+
+
+def hotel_benchmarks(tmp_dir, scale, ops, seed, with_caches):
+    # the hotel module opens hotel_reservation.db in the working directory when imported
+    os.chdir(tmp_dir)
+    sys.path.insert(0, HOTEL_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import hotel_db
+        import hotel_room_reservation as hotel
+
+    results = {}
+    rng = random.Random(seed)
+    hotel.create_tables()
+    room_rows = list(generators.rooms(max(scale // 100, 12), seed))
+    hotel.c.executemany("INSERT INTO rooms(room_number, room_type, rate, available) VALUES (?, ?, ?, ?)", room_rows)
+    hotel.conn.commit()
+    # seeded with the steps make_reservation runs (overlap check, then insert), one transaction per batch
+    reservation_rows = generators.reservations(scale, room_rows, seed)
+    while True:
+        batch = list(islice(reservation_rows, 50000))
+        if not batch:
+            break
+        for customer_name, room_number, check_in_date, check_out_date, total_cost in batch:
+            if hotel_db.room_is_free(hotel.c, room_number, check_in_date, check_out_date):
+                hotel_db.insert_reservation(hotel.c, customer_name, room_number, check_in_date, check_out_date,
+                                            total_cost)
+        hotel.conn.commit()
+    if with_caches:
+        hotel.enable_availability_calendar()
+        hotel.enable_pricing_engine()
+
+    customer_csv = os.path.join(tmp_dir, "customers.csv")
+    with open(customer_csv, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["cust_id", "first_name", "last_name", "dob", "phone"])
+        writer.writerows(generators.customers(scale, seed))
+    results["Customer.load_csv ({} rows)".format(scale)] = measure(hotel.Customer.load_csv, [(customer_csv,)])
+
+    room_numbers = [row[0] for row in room_rows]
+    stays = list(generators.stay_dates(ops, seed))
+    results["check_availability"] = measure(
+        hotel.check_availability, [(rng.choice(room_numbers),) + stay for stay in stays])
+    results["find_available_rooms"] = measure(hotel.find_available_rooms, stays[:max(ops // 10, 1)])
+    room_types = sorted({row[1] for row in room_rows})
+    results["calculate_cost"] = measure(hotel.calculate_cost, [(rng.choice(room_types),) + stay for stay in stays])
+    # make_reservation returns None when the room is already taken for the dates
+    results["make_reservation"] = measure(
+        hotel.make_reservation, [("Benchmark", rng.choice(room_numbers)) + stay + (0,) for stay in stays],
+        is_rejected=lambda reservation_id: reservation_id is None)
+    hotel.conn.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the company and hotel systems.")
+    parser.add_argument("--scale", type=int, default=100000, help="rows per seeded table (10k to 10M)")
+    parser.add_argument("--ops", type=int, default=2000, help="timed calls per single-row operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", choices=["company", "hotel"])
+    parser.add_argument("--with-caches", action="store_true",
+                        help="enable the hotel availability calendar and pricing engine")
+    parser.add_argument("--output", help="JSON file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "scale": args.scale,
+        "ops": args.ops,
+        "seed": args.seed,
+        "with_caches": args.with_caches,
+        "results": {},
+    }
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            if args.only in (None, "company"):
+                report["results"].update(company_benchmarks(tmp_dir, args.scale, args.ops, args.seed))
+            if args.only in (None, "hotel"):
+                report["results"].update(hotel_benchmarks(tmp_dir, args.scale, args.ops, args.seed, args.with_caches))
+        finally:
+            os.chdir(cwd)
+    report["peak_rss_kb"] = peak_rss_kb()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
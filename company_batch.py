@@ -0,0 +1,111 @@
+# Non-interactive entry point for the Company database: runs a scripted batch of
+# hire/raise/fire/view commands from a file (or stdin) in one process and one transaction.
+#
+# One command per line, arguments separated by spaces (quote values that contain spaces):
+#   hire <emp_id> <name> <age> <department> <designation> <manages_num_of_emp> <weekly_pay> [manager_id]
+#   raise <emp_id> <weekly_pay> [annual_bonus]
+#   fire <emp_id>
+#   view [emp_id]
+# Blank lines and lines starting with '#' are ignored.
+#
+# usage: python company_batch.py [commands.txt | -] [--db company.sqlite] [--in-memory]
+import argparse
+import os
+import shlex
+import sqlite3
+import sys
+
+from company_management_system import Company, Executive, Manager, annual_salary
+
+
+class BatchError(Exception):
+    pass
+
+
+def parse_commands(lines):
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            args = shlex.split(line)
+            yield line_number, args[0].lower(), args[1:]
+        except ValueError as e:
+            raise BatchError("line {}: {}".format(line_number, e)) from None
+
+
+def run_command(company, command, args, out=sys.stdout):
+    if command == "hire":
+        emp_id, name, age, department, designation, manages_num_of_emp, weekly_pay, *manager_id = args
+        if len(manager_id) > 1:
+            raise ValueError("too many values for hire")
+        emp_id, age, manages_num_of_emp, weekly_pay = int(emp_id), int(age), int(manages_num_of_emp), float(weekly_pay)
+        manager_id = int(manager_id[0]) if manager_id else None
+        # same salary rule as the interactive menu
+        if designation.lower() == 'manager':
+            salary = Manager(emp_id, name, age, department, weekly_pay, manages_num_of_emp).cal_annual_salary()
+        else:
+            salary = Executive(emp_id, name, age, department, weekly_pay, manages_num_of_emp).cal_annual_salary()
+        company.hire(emp_id, name, age, department, salary, designation, manages_num_of_emp, manager_id,
+                     raise_errors=True)
+    elif command == "raise":
+        emp_id, weekly_pay, *bonus = args
+        if len(bonus) > 1:
+            raise ValueError("too many values for raise")
+        bonus = float(bonus[0]) if bonus else 0.0
+        company.raise_salary(int(emp_id), annual_salary(float(weekly_pay), bonus), raise_errors=True)
+    elif command == "fire":
+        emp_id, = args
+        company.fire(int(emp_id), raise_errors=True)
+    elif command == "view":
+        if args:
+            emp_id, = args
+            print(company.fetch_all_employee_data(int(emp_id)), file=out)
+        else:
+            for employee in company.iter_employees():
+                print(employee, file=out)
+    else:
+        raise BatchError("unknown command '{}'".format(command))
+
+
+# runs every command inside one transaction; a malformed line or a failing command rolls the whole batch back
+def run_batch(company, lines, out=sys.stdout):
+    count = 0
+    with company.transaction():
+        for line_number, command, args in parse_commands(lines):
+            try:
+                run_command(company, command, args, out)
+            except (ValueError, BatchError, sqlite3.Error) as e:
+                raise BatchError("line {}: {}".format(line_number, e)) from None
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a batch of Company commands in one transaction.")
+    parser.add_argument("commands", nargs="?", default="-", help="command file, '-' for stdin (default)")
+    parser.add_argument("--db", default="company.sqlite", help="database file (default: company.sqlite)")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="load the database into memory, run the batch there and write it back in one step")
+    args = parser.parse_args(argv)
+
+    with Company(":memory:" if args.in_memory else args.db) as company:
+        if args.in_memory and os.path.exists(args.db):
+            company.restore(args.db)
+        try:
+            if args.commands == "-":
+                count = run_batch(company, sys.stdin)
+            else:
+                with open(args.commands) as file:
+                    count = run_batch(company, file)
+        except BatchError as e:
+            print("Batch aborted, nothing was saved: {}".format(e), file=sys.stderr)
+            return 1
+        if args.in_memory:
+            company.snapshot(args.db)
+    print("********* {} commands completed *********".format(count))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
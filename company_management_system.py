@@ -1,7 +1,38 @@
+import csv
+import json
+import os
+import queue
+import re
 import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import count, islice
+
+
+EXECUTIVE_BONUS = 100
+
+
+# turns legacy salary values such as "$5300.0" into numbers
+def parse_salary(salary):
+    if isinstance(salary, str):
+        salary = salary.strip().lstrip("$").replace(",", "")
+    return float(salary)
+
+
+# annual salary for a weekly pay plus an annual bonus, rounded to cents like cal_annual_salary;
+# shared by the menu and company_batch so both store the same salary for the same input
+def annual_salary(weekly_pay, bonus=0):
+    return round(round(weekly_pay * 52, 2) + bonus, 2)
 
 
 class Employee: # abstract class
+    # __slots__ keeps employee objects small when a large roster is held in memory
+    __slots__ = ("emp_id", "name", "age", "department")
+
     def __init__(self, emp_id, name, age, department):
         self.emp_id = emp_id
         self.name = name
@@ -13,6 +44,8 @@ class Employee: # abstract class
 
 
 class HourlyEmployee(Employee):
+    __slots__ = ("hourly_pay", "working_hours_per_week")
+
     def __init__(self, emp_id, name, age, department, hourly_pay, working_hrs_per_week):
         Employee.__init__(self,emp_id, name, age, department)
         self.hourly_pay = hourly_pay
@@ -20,163 +53,988 @@ class HourlyEmployee(Employee):
 
     # method to calculate salary
     def cal_annual_salary(self):
-        self.annual_salary = self.working_hours_per_week * self.hourly_pay * 52
-        return round(self.annual_salary, 2)
+        return round(self.working_hours_per_week * self.hourly_pay * 52, 2)
 
 
 class SalariedEmployee(Employee):
+    __slots__ = ("weekly_pay",)
+
     def __init__(self, emp_id, name, age, department, weekly_pay):
         Employee.__init__(self,emp_id, name, age, department)
         self.weekly_pay = weekly_pay
 
     # method to calculate salary
     def cal_annual_salary(self):
-        self.annual_salary = self.weekly_pay * 52
-        return round(self.annual_salary, 2)
+        return round(self.weekly_pay * 52, 2)
 
 
 class Manager(Employee):
+    __slots__ = ("weekly_pay", "manages_num_of_emp")
+
     def __init__(self, emp_id, name, age, department, weekly_pay, manages_num_of_emp):
         Employee.__init__(self,emp_id, name, age, department)
         self.weekly_pay = weekly_pay
         self.manages_num_of_emp = manages_num_of_emp # no of emplyees who are gonna work under manager
 
-    # calculating annual salary for manager
+    # calculating annual salary for manager, same as a salaried employee's pay
     def cal_annual_salary(self):
-        salaried_emp = SalariedEmployee(self.emp_id, self.name, self.age, self.department, self.weekly_pay)
-        self.manager_salary = salaried_emp.cal_annual_salary()
-        return round(self.manager_salary, 2)
+        return round(self.weekly_pay * 52, 2)
 
 
 class Executive(Employee):
+    __slots__ = ("weekly_pay", "manages_num_of_emp")
+
     def __init__(self, emp_id, name, age, department, weekly_pay, manages_num_of_emp):
         Employee.__init__(self,emp_id, name, age, department)
         self.weekly_pay = weekly_pay
         self.manages_num_of_emp = manages_num_of_emp # no of emplyees who are gonna work under executive
 
-    # calculating annual salary for executive
+    # calculating annual salary for executive, salaried pay plus the executive bonus
     def cal_annual_salary(self):
-        salaried_emp = SalariedEmployee(self.emp_id, self.name, self.age, self.department, self.weekly_pay)
-        self.executive_bonus = 100 # extra bonus for executive
-        self.executive_salary = salaried_emp.cal_annual_salary() + self.executive_bonus
-        return round(self.executive_salary, 2)
+        return round(round(self.weekly_pay * 52, 2) + EXECUTIVE_BONUS, 2)
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+
+
+# Opt-in per-statement statistics: calls, rows, errors and a latency histogram per normalised
+# statement, plus the EXPLAIN QUERY PLAN of every statement slower than slow_query_ms
+class QueryStats:
+    # upper bounds of the latency histogram buckets in milliseconds, the last bucket is open ended
+    BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+    def __init__(self, slow_query_ms=100):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._normalised = {}
+        self._statements = {}
+        self._slow_queries = {}
+
+    # literals become '?' and whitespace is collapsed, so the same query with other values is one entry
+    @staticmethod
+    def normalise(sql):
+        sql = _STRING_LITERAL.sub("?", sql)
+        sql = _NUMBER_LITERAL.sub("?", sql)
+        return " ".join(sql.split())
+
+    def _key(self, sql):
+        key = self._normalised.get(sql)
+        if key is None:
+            key = self._normalised[sql] = self.normalise(sql)
+        return key
+
+    def record(self, sql, rows, seconds, error=False):
+        key = self._key(sql)
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                entry = self._statements[key] = {"calls": 0, "rows": 0, "errors": 0, "total_ms": 0.0,
+                                                 "max_ms": 0.0, "histogram": [0] * (len(self.BUCKETS_MS) + 1)}
+            entry["calls"] += 1
+            entry["rows"] += max(rows, 0)
+            entry["errors"] += error
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["histogram"][bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+        return key
+
+    # rows of a query are only known once they are fetched
+    def add_rows(self, key, rows):
+        with self._lock:
+            self._statements[key]["rows"] += rows
+
+    def is_slow(self, seconds):
+        return self.slow_query_ms is not None and seconds * 1000 >= self.slow_query_ms
+
+    def record_slow(self, sql, seconds, plan):
+        with self._lock:
+            self._slow_queries[self._key(sql)] = {"ms": round(seconds * 1000, 3), "plan": plan}
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow_queries.clear()
+
+    def _percentile_ms(self, histogram, fraction):
+        target = sum(histogram) * fraction
+        seen = 0
+        for bucket, count in enumerate(histogram):
+            seen += count
+            if count and seen >= target:
+                return self.BUCKETS_MS[bucket] if bucket < len(self.BUCKETS_MS) else float("inf")
+        return 0.0
+
+    # statements ordered by total time spent, the ones that dominate first
+    def as_dict(self):
+        with self._lock:
+            statements = [(key, dict(entry, histogram=list(entry["histogram"])))
+                          for key, entry in self._statements.items()]
+            slow_queries = dict(self._slow_queries)
+        labels = ["<={}ms".format(bound) for bound in self.BUCKETS_MS] + [">{}ms".format(self.BUCKETS_MS[-1])]
+        report = []
+        for key, entry in sorted(statements, key=lambda item: item[1]["total_ms"], reverse=True):
+            report.append({
+                "statement": key,
+                "calls": entry["calls"],
+                "rows": entry["rows"],
+                "errors": entry["errors"],
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["calls"], 4),
+                "max_ms": round(entry["max_ms"], 3),
+                "p50_ms": self._percentile_ms(entry["histogram"], 0.50),
+                "p99_ms": self._percentile_ms(entry["histogram"], 0.99),
+                "histogram": {label: count for label, count in zip(labels, entry["histogram"]) if count},
+            })
+        return {"slow_query_ms": self.slow_query_ms, "statements": report,
+                "slow_queries": [dict(statement=key, **value) for key, value in slow_queries.items()]}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.as_dict(), indent=indent)
+
+    def report(self, limit=20):
+        data = self.as_dict()
+        lines = ["{:>8} {:>10} {:>7} {:>11} {:>9} {:>9} {:>9}  statement".format(
+            "calls", "rows", "errors", "total ms", "avg ms", "p99 ms", "max ms")]
+        for entry in data["statements"][:limit]:
+            lines.append("{calls:>8} {rows:>10} {errors:>7} {total_ms:>11.2f} {avg_ms:>9.3f} {p99_ms:>9} {max_ms:>9.2f}"
+                         "  {statement}".format(**entry))
+        for slow in data["slow_queries"]:
+            lines.append("")
+            lines.append("slow ({} ms): {}".format(slow["ms"], slow["statement"]))
+            for step in slow["plan"] or ():
+                lines.append("    " + step)
+        return "\n".join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _stats_key = None
+
+    def _timed(self, run, sql, parameters=None):
+        stats = self.connection.stats
+        if stats is None:
+            return run()
+        start = time.perf_counter()
+        try:
+            run()
+        except sqlite3.Error:
+            stats.record(sql, 0, time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        self._stats_key = stats.record(sql, self.rowcount, elapsed)
+        if stats.is_slow(elapsed):
+            stats.record_slow(sql, elapsed, self.connection.explain(sql, parameters))
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._timed(lambda: super(InstrumentedCursor, self).execute(sql, parameters), sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(lambda: super(InstrumentedCursor, self).executemany(sql, seq_of_parameters), sql)
+
+    def executescript(self, sql_script):
+        return self._timed(lambda: super(InstrumentedCursor, self).executescript(sql_script), sql_script)
+
+    def _count(self, rows):
+        if self._stats_key is not None and self.connection.stats is not None and self.rowcount < 0:
+            self.connection.stats.add_rows(self._stats_key, rows)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows))
+        return rows
+
+
+# Connection whose statements are timed into `stats` while it is set (None keeps it switched off)
+class InstrumentedConnection(sqlite3.Connection):
+    stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    # EXPLAIN QUERY PLAN of a single statement, None when it cannot be explained
+    def explain(self, sql, parameters=None):
+        if parameters is None:
+            return None
+        try:
+            rows = sqlite3.Connection.execute(self, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error:
+            return None
+        return [row[-1] for row in rows]
+
+
+class ConnectionPool:
+    # small thread-safe pool of long-lived sqlite connections, so callers
+    # stop paying for opening and tearing down a database handle per operation
+    def __init__(self, db_name, size=4, journal_mode="WAL", busy_timeout=5000, synchronous="NORMAL"):
+        self._db_name = db_name
+        self._size = size
+        self._journal_mode = journal_mode
+        self._busy_timeout = busy_timeout
+        self._synchronous = synchronous
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self.stats = None
+
+    def _new_connection(self):
+        conn = sqlite3.connect(self._db_name, check_same_thread=False, factory=InstrumentedConnection,
+                               uri=self._db_name.startswith("file:"))
+        if self._busy_timeout is not None:
+            conn.execute("PRAGMA busy_timeout = {:d};".format(int(self._busy_timeout)))
+        if self._journal_mode is not None:
+            conn.execute("PRAGMA journal_mode = {};".format(self._journal_mode))
+        if self._synchronous is not None:
+            conn.execute("PRAGMA synchronous = {};".format(self._synchronous))
+        return conn
+
+    def acquire(self):
+        conn = self._checkout()
+        conn.stats = self.stats
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self._created < self._size:
+                self._created += 1
+                try:
+                    return self._new_connection()
+                except Exception:
+                    self._created -= 1
+                    raise
+        # every connection is checked out, wait for one to come back
+        return self._idle.get()
+
+    def release(self, conn):
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._created = 0
+
+
+# ":memory:" would give every pooled connection its own empty database; it is turned into a named
+# shared-cache in-memory database instead, which lives until the pool is closed
+_memory_database_ids = count()
+
+
+def memory_database_uri():
+    return "file:memdb-{}-{}?mode=memory&cache=shared".format(os.getpid(), next(_memory_database_ids))
 
 
 class DBbase:
     _conn = None
     _cursor = None
 
-    def __init__(self, db_name):
+    # db_name is a file name, ":memory:" or a "file:" URI (e.g. an existing shared-cache memory database)
+    def __init__(self, db_name, pool_size=4, journal_mode="WAL", busy_timeout=5000, synchronous="NORMAL"):
+        if db_name == ":memory:":
+            db_name = memory_database_uri()
         self._db_name = db_name
-        self.connect()
+        self._pool = ConnectionPool(db_name, pool_size, journal_mode, busy_timeout, synchronous)
+        self._local = threading.local()
+        self._prepared = False
+        self._prepare_lock = threading.Lock()
 
+    # checks out a long-lived connection from the pool (kept for the older connect/close_db style)
     def connect(self):
-        self._conn = sqlite3.connect(self._db_name)
-        self._cursor = self._conn.cursor()
+        if self._conn is None:
+            self._conn = self._pool.acquire()
+            self._ensure_prepared(self._conn)
+            self._cursor = self._conn.cursor()
+
+    # pooled connection for one unit of work: commits on success, rolls back on error.
+    # inside transaction() the pinned connection is reused and left for the outer block to commit
+    @contextmanager
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._pool.acquire()
+        try:
+            self._ensure_prepared(conn)
+            with conn:
+                yield conn
+        finally:
+            self._pool.release(conn)
+
+    # groups several operations of the current thread into a single transaction
+    @contextmanager
+    def transaction(self):
+        if getattr(self._local, "conn", None) is not None:
+            yield self._local.conn
+            return
+        conn = self._pool.acquire()
+        self._local.conn = conn
+        try:
+            self._ensure_prepared(conn)
+            with conn:
+                conn.execute("BEGIN")
+                yield conn
+        finally:
+            self._local.conn = None
+            self._pool.release(conn)
+
+    # the database is initialised lazily, on the first connection actually used
+    def _ensure_prepared(self, conn):
+        if not self._prepared:
+            with self._prepare_lock:
+                if not self._prepared:
+                    self.prepare(conn)
+                    self._prepared = True
+
+    # hook for derived classes to create their schema; must be idempotent
+    def prepare(self, conn):
+        pass
 
     def execute_script(self, sql_string):
-        self._cursor.executescript(sql_string)
+        with self.connection() as conn:
+            conn.executescript(sql_string)
 
     @property
     def get_cursor(self):
+        self.connect()
         return self._cursor
 
     @property
     def get_connection(self):
+        self.connect()
         return self._conn
 
+    # opt-in statement instrumentation for every pooled connection
+    def enable_query_stats(self, slow_query_ms=100, stats=None):
+        self._pool.stats = stats or QueryStats(slow_query_ms)
+        if self._conn is not None:
+            self._conn.stats = self._pool.stats
+        return self._pool.stats
+
+    def disable_query_stats(self):
+        self._pool.stats = None
+        if self._conn is not None:
+            self._conn.stats = None
+
+    @property
+    def query_stats(self):
+        return self._pool.stats
+
+    # hands the checked out connection back to the pool, the handle itself stays open
     def close_db(self):
-        self._conn.close()
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+            self._cursor = None
+
+    # ---- snapshots through the sqlite backup API ----
+
+    # copies the whole database to the file at path; the copy is written next to it and then renamed,
+    # so path holds either the previous version or the complete new one, never a partial file.
+    # Nothing may have path open while it is replaced.
+    def snapshot(self, path):
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with self.connection() as conn:
+            target = sqlite3.connect(tmp_path)
+            try:
+                conn.backup(target)
+            finally:
+                target.close()
+        # journal files left over from the old file would be applied to the new one
+        for suffix in ("-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.replace(tmp_path, path)
+
+    # replaces the contents of this database with the snapshot (or any database file) at path
+    def restore(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        if getattr(self._local, "conn", None) is not None:
+            raise sqlite3.ProgrammingError("Cannot restore inside a transaction")
+        source = sqlite3.connect(path)
+        conn = self._pool.acquire()
+        try:
+            source.backup(conn)
+            # the snapshot may come from an older schema
+            with self._prepare_lock:
+                self.prepare(conn)
+                self._prepared = True
+        finally:
+            self._pool.release(conn)
+            source.close()
+
+    # closes every pooled connection for good
+    def close(self):
+        self.close_db()
+        self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def reset_database(self):
         raise NotImplementedError("Must be implemented in the derived class")
 
 
+EMPLOYEE_COLUMNS = ("emp_id", "name", "age", "department", "salary", "designation", "manages_num_of_emp")
+
+COMPANY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Company  (
+    emp_id  INTEGER NOT NULL PRIMARY KEY UNIQUE,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    department TEXT NOT NULL,
+    salary REAL NOT NULL,
+    designation TEXT NOT NULL,
+    manages_num_of_emp INTEGER NOT NULL,
+    manager_id INTEGER REFERENCES Company(emp_id)
+);
+CREATE TABLE IF NOT EXISTS salary_audit (
+    audit_id INTEGER PRIMARY KEY,
+    emp_id INTEGER NOT NULL,
+    old_salary REAL NOT NULL,
+    new_salary REAL NOT NULL,
+    reason TEXT,
+    changed_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE INDEX IF NOT EXISTS idx_salary_audit_emp_id ON salary_audit(emp_id);
+"""
+
+# department/designation indexes also carry salary, so grouped payroll reports are answered from the index alone
+COMPANY_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_company_department ON Company(department, salary);
+CREATE INDEX IF NOT EXISTS idx_company_designation ON Company(designation, salary);
+CREATE INDEX IF NOT EXISTS idx_company_salary ON Company(salary);
+"""
+
+# reporting hierarchy as a closure table: one row per (manager, report) pair at any distance, plus a
+# depth 0 row per employee, so every subtree query is a range scan on ancestor_id
+HIERARCHY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS company_hierarchy (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_company_hierarchy_descendant ON company_hierarchy(descendant_id, depth, ancestor_id);
+CREATE INDEX IF NOT EXISTS idx_company_manager ON Company(manager_id);
+"""
+
+# closure rows of a newly hired employee: itself, plus every ancestor of its manager one level further
+# down; nothing is added when the employee already exists (insert or ignore into Company skips it too)
+HIERARCHY_INSERT = """insert or ignore into company_hierarchy(ancestor_id, descendant_id, depth)
+    SELECT ancestor_id, descendant_id, depth FROM (
+        SELECT :emp_id AS ancestor_id, :emp_id AS descendant_id, 0 AS depth
+        UNION ALL
+        SELECT ancestor_id, :emp_id, depth + 1 FROM company_hierarchy WHERE descendant_id = :manager_id)
+    WHERE NOT EXISTS (SELECT 1 FROM Company WHERE emp_id = :emp_id);"""
+
+# headcount and payroll per (department, designation), kept up to date by triggers in the same
+# transaction as every insert, delete and salary/department/designation change on Company.
+# Totals are whole cents, so adding and subtracting never drifts from a fresh SUM.
+PAYROLL_SUMMARY_STATEMENTS = (
+    """CREATE TABLE IF NOT EXISTS payroll_summary (
+        department TEXT NOT NULL,
+        designation TEXT NOT NULL,
+        headcount INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        PRIMARY KEY (department, designation)
+    ) WITHOUT ROWID;""",
+    """CREATE TRIGGER IF NOT EXISTS payroll_summary_insert AFTER INSERT ON Company
+    BEGIN
+        INSERT INTO payroll_summary(department, designation, headcount, total_cents)
+        VALUES (new.department, new.designation, 1, CAST(round(new.salary * 100) AS INTEGER))
+        ON CONFLICT(department, designation) DO UPDATE
+        SET headcount = headcount + 1, total_cents = total_cents + excluded.total_cents;
+    END;""",
+    """CREATE TRIGGER IF NOT EXISTS payroll_summary_delete AFTER DELETE ON Company
+    BEGIN
+        UPDATE payroll_summary SET headcount = headcount - 1,
+                                   total_cents = total_cents - CAST(round(old.salary * 100) AS INTEGER)
+        WHERE department = old.department AND designation = old.designation;
+        DELETE FROM payroll_summary
+        WHERE department = old.department AND designation = old.designation AND headcount = 0;
+    END;""",
+    """CREATE TRIGGER IF NOT EXISTS payroll_summary_update AFTER UPDATE OF salary, department, designation ON Company
+    WHEN old.salary IS NOT new.salary OR old.department IS NOT new.department OR old.designation IS NOT new.designation
+    BEGIN
+        UPDATE payroll_summary SET headcount = headcount - 1,
+                                   total_cents = total_cents - CAST(round(old.salary * 100) AS INTEGER)
+        WHERE department = old.department AND designation = old.designation;
+        DELETE FROM payroll_summary
+        WHERE department = old.department AND designation = old.designation AND headcount = 0;
+        INSERT INTO payroll_summary(department, designation, headcount, total_cents)
+        VALUES (new.department, new.designation, 1, CAST(round(new.salary * 100) AS INTEGER))
+        ON CONFLICT(department, designation) DO UPDATE
+        SET headcount = headcount + 1, total_cents = total_cents + excluded.total_cents;
+    END;""",
+)
+
+# payroll_summary computed from scratch
+PAYROLL_SUMMARY_QUERY = """SELECT department, designation, COUNT(*), SUM(CAST(round(salary * 100) AS INTEGER))
+                           FROM Company GROUP BY department, designation"""
+
+# one row of a grouped payroll report
+PayrollSummary = namedtuple("PayrollSummary", ["group", "headcount", "total_payroll", "average_payroll"])
+
+# summary returned by the bulk import functions
+HireReport = namedtuple("HireReport", ["inserted", "skipped", "elapsed", "rows_per_sec"])
+
+# adjust_salaries drops and rebuilds the Company indexes that carry salary when it changes more than
+# this share of the rows: re-sorting once is far cheaper than moving each entry inside the index
+INDEX_REBUILD_SHARE = 0.1
+
+# summary returned by adjust_salaries
+SalaryAdjustment = namedtuple("SalaryAdjustment", ["changed", "payroll_before", "payroll_after", "elapsed"])
+
+
 class Company(DBbase):
-    def __init__(self):
-        super().__init__("company.sqlite")
+    def __init__(self, db_name="company.sqlite", **pool_options):
+        super().__init__(db_name, **pool_options)
+
+    # hire, raise_salary and fire print their errors; with raise_errors=True they are raised instead,
+    # so a caller inside transaction() can roll back everything it has done so far
 
     # hire function to add a record of a new employee in the database
-    def hire(self,emp_id, name, age, department, salary, designation, manages_num_of_emp):
+    # manager_id is the emp_id of the employee's manager, who must already be hired
+    def hire(self,emp_id, name, age, department, salary, designation, manages_num_of_emp, manager_id=None,
+             raise_errors=False):
         try:
-            super().connect()
-            super().get_cursor.execute(
-                """insert or ignore into Company(emp_id, name, age, 
-                department, salary, designation, manages_num_of_emp) values (?,?,?,?,?,?,?);""",
-                (emp_id, name, age, department, salary, designation, manages_num_of_emp))
-
-            super().get_connection.commit()
+            with self.transaction() as conn:
+                if manager_id is not None and conn.execute("SELECT 1 FROM Company WHERE emp_id = ?;",
+                                                           (manager_id,)).fetchone() is None:
+                    raise ValueError("manager {} not found".format(manager_id))
+                conn.execute(HIERARCHY_INSERT, {"emp_id": emp_id, "manager_id": manager_id})
+                conn.execute(
+                    """insert or ignore into Company(emp_id, name, age, 
+                    department, salary, designation, manages_num_of_emp, manager_id) values (?,?,?,?,?,?,?,?);""",
+                    (emp_id, name, age, department, parse_salary(salary), designation, manages_num_of_emp, manager_id))
 
             print("Added employee record successfully")
         except Exception as e:
+            if raise_errors:
+                raise
             print("An error has occurred : {}".format(e))
-        finally:
-            super().close_db()
 
     # raise salary function to update the salary of a specific employee in the database
-    def raise_salary(self, emp_id, salary):
+    def raise_salary(self, emp_id, salary, reason=None, raise_errors=False):
         try:
-            super().connect()
-            super().get_cursor.execute("""update Company set salary = ?
-                                        WHERE emp_id = ?;""",
-                                       (salary, emp_id))
+            salary = parse_salary(salary)
+            with self.transaction() as conn:
+                conn.execute("""insert into salary_audit(emp_id, old_salary, new_salary, reason)
+                                select emp_id, salary, ?, ? FROM Company WHERE emp_id = ?;""",
+                             (salary, reason, emp_id))
+                conn.execute("""update Company set salary = ?
+                                WHERE emp_id = ?;""",
+                             (salary, emp_id))
 
-            super().get_connection.commit()
             print("Updated salary successfully!")
         except Exception as e:
+            if raise_errors:
+                raise
             print("An error has occurred : {}".format(e))
-        finally:
-            super().close_db()
 
-    # fire function to delete the record of a specific employee from the database
-    def fire(self, emp_id):
+    # fire function to delete the record of a specific employee from the database;
+    # their reports move up to the fired employee's own manager
+    def fire(self, emp_id, raise_errors=False):
         try:
-            super().connect()
-            super().get_cursor.execute("""delete FROM Company WHERE emp_id = ?;""", (emp_id,))
-            super().get_connection.commit()
+            with self.transaction() as conn:
+                # paths that ran through the fired employee get one level shorter
+                conn.execute("""update company_hierarchy set depth = depth - 1
+                                WHERE descendant_id IN (SELECT descendant_id FROM company_hierarchy
+                                                        WHERE ancestor_id = ? AND depth > 0)
+                                AND ancestor_id IN (SELECT ancestor_id FROM company_hierarchy
+                                                    WHERE descendant_id = ? AND depth > 0);""", (emp_id, emp_id))
+                conn.execute("""delete FROM company_hierarchy WHERE ancestor_id = ?;""", (emp_id,))
+                conn.execute("""delete FROM company_hierarchy WHERE descendant_id = ?;""", (emp_id,))
+                conn.execute("""update Company set manager_id = (SELECT manager_id FROM Company WHERE emp_id = ?)
+                                WHERE manager_id = ?;""", (emp_id, emp_id))
+                conn.execute("""delete FROM Company WHERE emp_id = ?;""", (emp_id,))
             print("Deleted employee record successfully")
             return True
         except Exception as e:
+            if raise_errors:
+                raise
             print("An error has occurred : {}".format(e))
             return False
-        finally:
-            super().close_db()
+
+    # raises (or cuts) the salary of every employee matching the department/designation filters
+    # by percent and/or a fixed amount, rounded to cents, as one set-based UPDATE in one transaction;
+    # every change is recorded in salary_audit with the old and new salary
+    def adjust_salaries(self, percent=0, amount=0, department=None, designation=None, reason=None):
+        start = time.perf_counter()
+        factor = 1 + parse_salary(percent) / 100
+        amount = parse_salary(amount)
+        new_salary = "round(salary * ? + ?, 2)"
+        with self.transaction() as conn:
+            sql, params = self._filtered("SELECT COALESCE(SUM(salary), 0) FROM Company", department, designation)
+            payroll_before = conn.execute(sql, params).fetchone()[0]
+            # old and new salaries are computed by the same SQL expression the UPDATE uses,
+            # so the audit trail matches the table exactly
+            # rows whose salary would not change get neither an audit row nor an update
+            unchanged = (new_salary + " <> salary", [factor, amount])
+            sql, params = self._filtered(
+                "insert into salary_audit(emp_id, old_salary, new_salary, reason) "
+                "SELECT emp_id, salary, " + new_salary + ", ? FROM Company", department, designation, unchanged)
+            changed = conn.execute(sql + " ORDER BY emp_id", [factor, amount, reason] + params).rowcount
+            indexes = []
+            if changed > conn.execute("SELECT COUNT(*) FROM Company").fetchone()[0] * INDEX_REBUILD_SHARE:
+                # only indexes with a salary column have entries to move, idx_company_manager is left alone
+                indexes = conn.execute("""SELECT DISTINCT m.name, m.sql FROM sqlite_master AS m, pragma_index_info(m.name) AS i
+                                          WHERE m.type = 'index' AND m.tbl_name = 'Company' AND m.sql IS NOT NULL
+                                          AND i.name = 'salary'""").fetchall()
+                for name, _ in indexes:
+                    conn.execute('DROP INDEX "{}"'.format(name))
+            sql, params = self._filtered("update Company set salary = " + new_salary, department, designation, unchanged)
+            conn.execute(sql, [factor, amount] + params)
+            for _, index_sql in indexes:
+                conn.execute(index_sql)
+            sql, params = self._filtered("SELECT COALESCE(SUM(salary), 0) FROM Company", department, designation)
+            payroll_after = conn.execute(sql, params).fetchone()[0]
+        return SalaryAdjustment(changed, round(payroll_before, 2), round(payroll_after, 2),
+                                time.perf_counter() - start)
+
+    # salary changes of one employee, oldest first
+    def salary_history(self, emp_id):
+        with self.connection() as conn:
+            return conn.execute("""SELECT old_salary, new_salary, reason, changed_at FROM salary_audit
+                                   WHERE emp_id = ? ORDER BY audit_id;""", (emp_id,)).fetchall()
+
+    # bulk hire: rows (tuples in EMPLOYEE_COLUMNS order or dicts keyed by column name, manager_id
+    # optional) are streamed in batches through executemany, one transaction per batch;
+    # managers have to come before their reports
+    def hire_many(self, rows, batch_size=5000):
+        inserted = 0
+        skipped = 0
+        start = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            batch = [self._employee_row(row) for row in islice(rows, batch_size)]
+            if not batch:
+                break
+            # an emp_id repeated in the batch is skipped like one already in the table: the first row wins
+            first_rows = {}
+            for row in batch:
+                first_rows.setdefault(row[0], row)
+            with self.connection() as conn:
+                conn.executemany(HIERARCHY_INSERT, ({"emp_id": row[0], "manager_id": row[7]}
+                                                    for row in first_rows.values()))
+                # rowcount, unlike total_changes, leaves out the payroll_summary rows written by triggers
+                added = conn.executemany(
+                    """insert or ignore into Company(emp_id, name, age,
+                    department, salary, designation, manages_num_of_emp, manager_id) values (?,?,?,?,?,?,?,?);""",
+                    batch).rowcount
+            inserted += added
+            skipped += len(batch) - added
+        elapsed = time.perf_counter() - start
+        rows_per_sec = (inserted + skipped) / elapsed if elapsed else 0.0
+        return HireReport(inserted, skipped, elapsed, rows_per_sec)
+
+    # bulk hire from a CSV (with a header row) or JSONL export, read lazily line by line
+    def hire_from_file(self, path, batch_size=5000):
+        with open(path, newline="") as file:
+            if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson"):
+                rows = (json.loads(line) for line in file if line.strip())
+            else:
+                rows = csv.DictReader(file)
+            return self.hire_many(rows, batch_size)
+
+    @staticmethod
+    def _employee_row(row):
+        if isinstance(row, dict):
+            row = [row[column] for column in EMPLOYEE_COLUMNS] + [row.get("manager_id")]
+        elif len(row) not in (len(EMPLOYEE_COLUMNS), len(EMPLOYEE_COLUMNS) + 1):
+            raise ValueError("Expected {} employee fields, got {}".format(len(EMPLOYEE_COLUMNS), len(row)))
+        else:
+            row = list(row) + [None] * (len(EMPLOYEE_COLUMNS) + 1 - len(row))
+        row[4] = parse_salary(row[4])
+        # an empty CSV field means no manager
+        row[7] = int(row[7]) if row[7] not in (None, "") else None
+        return row
 
     # view all or single employee's data
     def fetch_all_employee_data(self, emp_id=None):
         # if emp_id is null (or None), then get everything, else get by emp_id or get by question
         try:
-            super().connect()
-            if emp_id is not None:
-                return super().get_cursor.execute("""SELECT * FROM Company WHERE emp_id = ? ;""",
-                                                  (emp_id,)).fetchone()
-            else:
-                return super().get_cursor.execute("""SELECT * FROM Company;""").fetchall()
+            with self.connection() as conn:
+                if emp_id is not None:
+                    return conn.execute("""SELECT * FROM Company WHERE emp_id = ? ;""",
+                                        (emp_id,)).fetchone()
+                else:
+                    return conn.execute("""SELECT * FROM Company;""").fetchall()
         except Exception as e:
             print("An error has occurred : {}".format(e))
-        finally:
-            super().close_db()
+
+    # streams employees in emp_id order using keyset pagination on the primary key,
+    # so only one page of rows is held in memory at a time
+    def iter_employees(self, page_size=500, after_emp_id=None):
+        for page in self.iter_employee_pages(page_size, after_emp_id):
+            yield from page
+
+    def iter_employee_pages(self, page_size=500, after_emp_id=None):
+        while True:
+            with self.connection() as conn:
+                if after_emp_id is None:
+                    page = conn.execute("""SELECT * FROM Company ORDER BY emp_id LIMIT ?;""",
+                                        (page_size,)).fetchall()
+                else:
+                    page = conn.execute("""SELECT * FROM Company WHERE emp_id > ?
+                                           ORDER BY emp_id LIMIT ?;""",
+                                        (after_emp_id, page_size)).fetchall()
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_emp_id = page[-1][0]
+
+    # creates the table and indexes if they are missing, nothing is dropped
+    def prepare(self, conn):
+        conn.executescript(COMPANY_SCHEMA + COMPANY_INDEXES)
+        # databases created before the reporting hierarchy existed
+        if "manager_id" not in [row[1] for row in conn.execute("PRAGMA table_info(Company);")]:
+            conn.execute("ALTER TABLE Company ADD COLUMN manager_id INTEGER REFERENCES Company(emp_id);")
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'company_hierarchy';").fetchone()
+        conn.executescript(HIERARCHY_SCHEMA)
+        if not exists:
+            self._build_hierarchy(conn)
+            conn.commit()
+        # databases created when salary was stored as TEXT; the payroll totals need numbers
+        if self._migrate_salary(conn):
+            print("Salary column migrated to numeric values")
+        self._create_payroll_summary(conn)
+        conn.commit()
 
     def reset_database(self):
         sql = """
         DROP TABLE IF EXISTS Company;
+        DROP TABLE IF EXISTS salary_audit;
+        DROP TABLE IF EXISTS company_hierarchy;
+        DROP TABLE IF EXISTS payroll_summary;
+        """
+        super().execute_script(sql + COMPANY_SCHEMA + COMPANY_INDEXES + HIERARCHY_SCHEMA)
+        with self.connection() as conn:
+            self._create_payroll_summary(conn)
+        print("\ndatabase reset completed successfully!")
+
+    # creates the summary table and its triggers, filling the table when it is new
+    @staticmethod
+    def _create_payroll_summary(conn):
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'payroll_summary';").fetchone()
+        for statement in PAYROLL_SUMMARY_STATEMENTS:
+            conn.execute(statement)
+        if not exists:
+            conn.execute("INSERT INTO payroll_summary " + PAYROLL_SUMMARY_QUERY + ";")
+
+    # compares payroll_summary with totals computed from Company; returns one
+    # (department, designation, stored (headcount, total_cents), actual (headcount, total_cents)) per
+    # mismatch, and with rebuild=True replaces the table contents with the fresh totals
+    def verify_payroll_summary(self, rebuild=False):
+        with self.transaction() as conn:
+            stored = {row[:2]: row[2:] for row in conn.execute("SELECT * FROM payroll_summary;")}
+            actual = {row[:2]: row[2:] for row in conn.execute(PAYROLL_SUMMARY_QUERY + ";")}
+            differences = []
+            for key in sorted(set(stored) | set(actual)):
+                if stored.get(key) != actual.get(key):
+                    differences.append(key + (stored.get(key), actual.get(key)))
+            if rebuild and differences:
+                conn.execute("DELETE FROM payroll_summary;")
+                conn.execute("INSERT INTO payroll_summary " + PAYROLL_SUMMARY_QUERY + ";")
+        return differences
+
+    # recomputes the closure table from Company.manager_id, e.g. after manager_id was edited by hand
+    def rebuild_hierarchy(self):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM company_hierarchy;")
+            self._build_hierarchy(conn)
+
+    @staticmethod
+    def _build_hierarchy(conn):
+        conn.execute("""
+        WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+            SELECT emp_id, emp_id, 0 FROM Company
+            UNION ALL
+            SELECT tree.ancestor_id, Company.emp_id, tree.depth + 1
+            FROM tree JOIN Company ON Company.manager_id = tree.descendant_id
+        )
+        INSERT INTO company_hierarchy(ancestor_id, descendant_id, depth) SELECT * FROM tree;""")
 
-        CREATE TABLE Company  (
+    # adds the reporting indexes to a database created before they existed
+    def create_indexes(self):
+        super().execute_script(COMPANY_INDEXES)
+
+    # one-off migration for databases created when salary was stored as TEXT ("$5300.0"):
+    # rebuilds the table with a REAL salary column and converts the existing values
+    # (prepare() runs it on every start, so this is only needed on a connection opened elsewhere)
+    def migrate_salary_to_numeric(self):
+        with self.transaction() as conn:
+            migrated = self._migrate_salary(conn)
+        if migrated:
+            print("Salary column migrated to numeric values")
+        return migrated
+
+    @staticmethod
+    def _migrate_salary(conn):
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(Company);")}
+        if columns.get("salary", "").upper() != "TEXT":
+            return False
+        conn.execute("""
+        CREATE TABLE Company_numeric  (
             emp_id  INTEGER NOT NULL PRIMARY KEY UNIQUE,
             name TEXT NOT NULL,
             age INTEGER NOT NULL,
             department TEXT NOT NULL,
-            salary TEXT NOT NULL,
+            salary REAL NOT NULL,
             designation TEXT NOT NULL,
-            manages_num_of_emp INTEGER NOT NULL
-        );
-        """
-        super().execute_script(sql)
-        print("\ndatabase reset completed successfully!")
+            manages_num_of_emp INTEGER NOT NULL,
+            manager_id INTEGER REFERENCES Company(emp_id)
+        );""")
+        conn.execute("""
+        INSERT INTO Company_numeric
+        SELECT emp_id, name, age, department,
+               CAST(REPLACE(REPLACE(TRIM(salary), '$', ''), ',', '') AS REAL),
+               designation, manages_num_of_emp, manager_id
+        FROM Company;""")
+        conn.execute("DROP TABLE Company;")
+        conn.execute("ALTER TABLE Company_numeric RENAME TO Company;")
+        for statement in COMPANY_INDEXES.strip().splitlines():
+            conn.execute(statement)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_company_manager ON Company(manager_id);")
+        # the triggers went with the old table, and the summary was built from the TEXT salaries
+        conn.execute("DROP TABLE IF EXISTS payroll_summary;")
+        Company._create_payroll_summary(conn)
+        return True
+
+    # total annual payroll, read from the maintained summary (one row per department and designation)
+    def total_payroll(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT COALESCE(SUM(total_cents), 0) FROM payroll_summary;").fetchone()[0] / 100
+
+    # ---- reports, read from payroll_summary instead of scanning Company ----
+
+    def payroll_by_department(self):
+        return self._grouped_payroll("department")
+
+    def payroll_by_designation(self):
+        return self._grouped_payroll("designation")
+
+    def _grouped_payroll(self, column):
+        with self.connection() as conn:
+            rows = conn.execute("""SELECT {0}, SUM(headcount), SUM(total_cents)
+                                   FROM payroll_summary GROUP BY {0} ORDER BY {0};""".format(column)).fetchall()
+        return [PayrollSummary(group, headcount, total_cents / 100, total_cents / 100 / headcount)
+                for group, headcount, total_cents in rows]
+
+    def headcount(self, department=None, designation=None):
+        sql, params = self._filtered("SELECT COALESCE(SUM(headcount), 0) FROM payroll_summary", department, designation)
+        with self.connection() as conn:
+            return conn.execute(sql + ";", params).fetchone()[0]
+
+    def department_employees(self, department):
+        with self.connection() as conn:
+            return conn.execute("""SELECT * FROM Company WHERE department = ? ORDER BY emp_id;""",
+                                (department,)).fetchall()
+
+    def top_earners(self, n=10, department=None, designation=None):
+        sql, params = self._filtered("SELECT * FROM Company", department, designation)
+        with self.connection() as conn:
+            return conn.execute(sql + " ORDER BY salary DESC LIMIT ?;", params + [n]).fetchall()
+
+    # ---- reporting hierarchy, each query a range scan on the closure table ----
+
+    # everyone under emp_id, nearest first; direct_only=True limits it to direct reports
+    def reports(self, emp_id, direct_only=False):
+        with self.connection() as conn:
+            return conn.execute("""SELECT Company.* FROM company_hierarchy
+                                   JOIN Company ON Company.emp_id = company_hierarchy.descendant_id
+                                   WHERE company_hierarchy.ancestor_id = ? AND company_hierarchy.depth BETWEEN 1 AND ?
+                                   ORDER BY company_hierarchy.depth, Company.emp_id;""",
+                                (emp_id, 1 if direct_only else sys.maxsize)).fetchall()
+
+    # (direct reports, everyone below) of emp_id
+    def span_of_control(self, emp_id):
+        with self.connection() as conn:
+            direct, total = conn.execute("""SELECT COUNT(CASE WHEN depth = 1 THEN 1 END), COUNT(*)
+                                            FROM company_hierarchy WHERE ancestor_id = ? AND depth > 0;""",
+                                         (emp_id,)).fetchone()
+        return direct, total
+
+    # payroll of emp_id and everyone under them
+    def subtree_payroll(self, emp_id):
+        with self.connection() as conn:
+            row = conn.execute("""SELECT COUNT(*), COALESCE(SUM(Company.salary), 0), AVG(Company.salary)
+                                  FROM company_hierarchy
+                                  JOIN Company ON Company.emp_id = company_hierarchy.descendant_id
+                                  WHERE company_hierarchy.ancestor_id = ?;""", (emp_id,)).fetchone()
+        return PayrollSummary(emp_id, *row)
+
+    # managers above emp_id, from the direct manager up to the top
+    def management_chain(self, emp_id):
+        with self.connection() as conn:
+            return conn.execute("""SELECT Company.* FROM company_hierarchy
+                                   JOIN Company ON Company.emp_id = company_hierarchy.ancestor_id
+                                   WHERE company_hierarchy.descendant_id = ? AND company_hierarchy.depth > 0
+                                   ORDER BY company_hierarchy.depth;""", (emp_id,)).fetchall()
+
+    # appends the WHERE clause for the optional department/designation filters; condition is an
+    # extra (sql, params) pair, placed first so its parameters come right after those of sql
+    @staticmethod
+    def _filtered(sql, department, designation, condition=None):
+        conditions = []
+        params = []
+        if condition is not None:
+            conditions.append(condition[0])
+            params.extend(condition[1])
+        if department is not None:
+            conditions.append("department = ?")
+            params.append(department)
+        if designation is not None:
+            conditions.append("designation = ?")
+            params.append(designation)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, params
 
-# calling reset_database to create the database
-company = Company()
-company.reset_database()
 
 
 class CompanyMenu:
@@ -189,6 +1047,7 @@ class CompanyMenu:
             "2": "Raise employee's salary",
             "3": "Fire an employee",
             "4": "View the Company's employee details",
+            "5": "Raise salaries of a department or designation",
             "exit": "Exit the program"
         }
         # taking user input for action menu
@@ -207,27 +1066,28 @@ class CompanyMenu:
                 department = input("Please enter the department of the new employee:")
                 emp_designation = input("Please enter the designation of the new employee (Manager or Executive):")
                 manages_num_of_emp = int(input("Please enter the number of employees who would be managed by the new employee:"))
+                manager_id = input("Please enter the employee id of the new employee's manager (leave empty for none):")
+                manager_id = int(manager_id) if manager_id.strip() else None
 
                 # calculating employee's salary on basis of the employee's designation
                 if emp_designation.lower() == 'manager':
                     weekly_pay = float(input("Please enter the weekly pay for the manager:"))
                     manager = Manager(emp_id, name, age, department, weekly_pay, manages_num_of_emp)
-                    salary = "$" + str(manager.cal_annual_salary())
+                    salary = manager.cal_annual_salary()
                 else:
                     weekly_pay = float(input("Please enter the weekly pay for the executive:"))
                     executive = Executive(emp_id, name, age, department, weekly_pay, manages_num_of_emp)
-                    salary = "$" + str(executive.cal_annual_salary())
+                    salary = executive.cal_annual_salary()
 
-                company.hire(emp_id, name, age, department, salary, emp_designation, manages_num_of_emp)
+                company.hire(emp_id, name, age, department, salary, emp_designation, manages_num_of_emp, manager_id)
                 print("********* Employee hired successfully! *********\n")
 
             # updating employee's salary in the database
             elif user_selection == '2':
                 emp_id = int(input("Please enter the employee's id whose salary you want to update:"))
                 weekly_pay = float(input("Please enter the revised weekly pay for the employee:"))
-                revised_salary = weekly_pay * 52
                 bonus = float(input("Please enter the annual bonus you want to give to the employee:"))
-                revised_salary = "$" + str(revised_salary + bonus)
+                revised_salary = annual_salary(weekly_pay, bonus)
                 company.raise_salary(emp_id, revised_salary)
                 print("********* Employee's salary raised sucessfully! *********\n")
 
@@ -239,23 +1099,47 @@ class CompanyMenu:
 
             # view all employees' data
             elif user_selection == '4':
-                all_employee_data = company.fetch_all_employee_data()
-                print(all_employee_data)
+                # pages are fetched lazily, only when the user asks for the next one
+                for page_number, page in enumerate(company.iter_employee_pages(page_size=20), start=1):
+                    print("--------- Page {} ---------".format(page_number))
+                    for employee in page:
+                        print(employee)
+                    if len(page) == 20 and input("Press Enter for the next page or 'q' to stop:").lower() == 'q':
+                        break
                 print("********* Employees data completed! *********\n")
 
+            # raise the salaries of a whole department and/or designation in one go
+            elif user_selection == '5':
+                department = input("Please enter the department (leave empty for all):") or None
+                designation = input("Please enter the designation (leave empty for all):") or None
+                percent = float(input("Please enter the raise in percent (0 for none):") or 0)
+                amount = float(input("Please enter the fixed annual raise (0 for none):") or 0)
+                adjustment = company.adjust_salaries(percent, amount, department, designation,
+                                                     reason="menu: {}% + {}".format(percent, amount))
+                print("Raised {} salaries, payroll {} -> {}".format(adjustment.changed, adjustment.payroll_before,
+                                                                   adjustment.payroll_after))
+                print("********* Salaries raised successfully! *********\n")
+
             else:
-                if user_selection not in ['1','2','3','4','exit']:
+                if user_selection not in ['1','2','3','4','5','exit']:
                     print("Invalid selection. Please try again.")
 
-cm = CompanyMenu()
-cm.menu()
-
-
-
-
-
-
-
+        company.close()
 
+if __name__ == "__main__":
+    # the schema is created on first use; pass --reset to start from an empty table
+    if "--reset" in sys.argv[1:]:
+        with Company() as company:
+            company.reset_database()
 
+    # --verify-payroll checks the maintained payroll totals against the Company table, repairs them and exits
+    if "--verify-payroll" in sys.argv[1:]:
+        with Company() as company:
+            differences = company.verify_payroll_summary(rebuild=True)
+        for department, designation, stored, actual in differences:
+            print("{} / {}: stored {} actual {} (headcount, cents)".format(department, designation, stored, actual))
+        print("payroll_summary {}".format("rebuilt" if differences else "is consistent"))
+        sys.exit(1 if differences else 0)
 
+    cm = CompanyMenu()
+    cm.menu()
@@ -0,0 +1,90 @@
+# Array backed, columnar in-memory roster of the Company table.
+# Every column lives in a typed array (names in one utf-8 buffer, department and designation
+# dictionary encoded), so a row costs a few dozen bytes instead of a full Python object.
+from array import array
+from collections import namedtuple
+
+EmployeeRow = namedtuple("EmployeeRow", ["emp_id", "name", "age", "department", "salary",
+                                         "designation", "manages_num_of_emp"])
+
+
+class EmployeeTable:
+    def __init__(self):
+        self.emp_id = array("q")
+        self.age = array("H")
+        self.salary = array("d")
+        self.manages_num_of_emp = array("l")
+        self.department_code = array("H")
+        self.designation_code = array("H")
+        self._names = bytearray()
+        self._name_offsets = array("L", [0])
+        self.departments = []
+        self.designations = []
+        self._department_codes = {}
+        self._designation_codes = {}
+
+    # loads the roster straight from company.sqlite, one page at a time
+    @classmethod
+    def from_company(cls, company, page_size=10000):
+        table = cls()
+        table.extend(company.iter_employees(page_size=page_size))
+        return table
+
+    @classmethod
+    def from_rows(cls, rows):
+        table = cls()
+        table.extend(rows)
+        return table
+
+    def append(self, emp_id, name, age, department, salary, designation, manages_num_of_emp):
+        self.emp_id.append(emp_id)
+        self.age.append(age)
+        self.salary.append(salary)
+        self.manages_num_of_emp.append(manages_num_of_emp)
+        self.department_code.append(self._encode(department, self.departments, self._department_codes))
+        self.designation_code.append(self._encode(designation, self.designations, self._designation_codes))
+        self._names += name.encode("utf-8")
+        self._name_offsets.append(len(self._names))
+
+    # rows may carry trailing columns (Company rows end with manager_id), only the employee fields are kept
+    def extend(self, rows):
+        width = len(EmployeeRow._fields)
+        for row in rows:
+            self.append(*row[:width])
+
+    @staticmethod
+    def _encode(value, values, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def name(self, index):
+        return self._names[self._name_offsets[index]:self._name_offsets[index + 1]].decode("utf-8")
+
+    def __len__(self):
+        return len(self.emp_id)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("EmployeeTable index out of range")
+        return EmployeeRow(self.emp_id[index], self.name(index), self.age[index],
+                           self.departments[self.department_code[index]], self.salary[index],
+                           self.designations[self.designation_code[index]],
+                           self.manages_num_of_emp[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def total_salary(self):
+        return sum(self.salary)
+
+    # bytes held by the column buffers (the small department/designation dictionaries excluded)
+    def nbytes(self):
+        columns = (self.emp_id, self.age, self.salary, self.manages_num_of_emp,
+                   self.department_code, self.designation_code, self._name_offsets)
+        return sum(column.itemsize * len(column) for column in columns) + len(self._names)
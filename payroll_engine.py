@@ -0,0 +1,112 @@
+# Batch payroll engine: annual salaries for the whole workforce in one columnar pass.
+# Results are identical to HourlyEmployee / SalariedEmployee / Manager / Executive.cal_annual_salary.
+from array import array
+from itertools import repeat
+from operator import mul
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the array based fallback gives the same results
+    np = None
+
+from company_management_system import (EXECUTIVE_BONUS, Executive, HourlyEmployee, Manager,
+                                       SalariedEmployee)
+
+# designation codes used in the designation column
+HOURLY = 0
+SALARIED = 1
+MANAGER = 2
+EXECUTIVE = 3
+
+DESIGNATION_CODES = {
+    "hourly": HOURLY,
+    "hourlyemployee": HOURLY,
+    "salaried": SALARIED,
+    "salariedemployee": SALARIED,
+    "manager": MANAGER,
+    "executive": EXECUTIVE,
+}
+
+_CLASS_CODES = {HourlyEmployee: HOURLY, SalariedEmployee: SALARIED, Manager: MANAGER, Executive: EXECUTIVE}
+
+
+def designation_code(designation):
+    if isinstance(designation, int):
+        return designation
+    try:
+        return DESIGNATION_CODES[designation.replace(" ", "").lower()]
+    except KeyError:
+        raise ValueError("Unknown designation: {}".format(designation)) from None
+
+
+# builds the four payroll columns from employee objects; unused pay fields are stored as 0
+def employee_columns(employees):
+    designations = array("b")
+    weekly_pay = array("d")
+    hourly_pay = array("d")
+    hours_per_week = array("d")
+    for employee in employees:
+        code = _CLASS_CODES[type(employee)]
+        designations.append(code)
+        if code == HOURLY:
+            weekly_pay.append(0.0)
+            hourly_pay.append(employee.hourly_pay)
+            hours_per_week.append(employee.working_hours_per_week)
+        else:
+            weekly_pay.append(employee.weekly_pay)
+            hourly_pay.append(0.0)
+            hours_per_week.append(0.0)
+    return designations, weekly_pay, hourly_pay, hours_per_week
+
+
+# annual salary per row; designations may be codes or names ("Manager", "Executive", ...)
+def compute_annual_salaries(designations, weekly_pay, hourly_pay, hours_per_week):
+    if not isinstance(designations, array) and (np is None or not isinstance(designations, np.ndarray)):
+        designations = array("b", map(designation_code, designations))
+    if not len(designations) == len(weekly_pay) == len(hourly_pay) == len(hours_per_week):
+        raise ValueError("Payroll columns must all have the same length")
+    if np is not None:
+        return _annual_salaries_numpy(designations, weekly_pay, hourly_pay, hours_per_week)
+    return _annual_salaries_python(designations, weekly_pay, hourly_pay, hours_per_week)
+
+
+def total_payroll(designations, weekly_pay, hourly_pay, hours_per_week):
+    return sum(compute_annual_salaries(designations, weekly_pay, hourly_pay, hours_per_week))
+
+
+def _annual_salaries_python(designations, weekly_pay, hourly_pay, hours_per_week):
+    salaried = map(round, map(mul, weekly_pay, repeat(52)), repeat(2))
+    hourly = map(round, map(mul, map(mul, hours_per_week, hourly_pay), repeat(52)), repeat(2))
+    return array("d", map(_pick_salary, designations, salaried, hourly))
+
+
+def _pick_salary(code, salaried, hourly):
+    if code == HOURLY:
+        return hourly
+    if code == EXECUTIVE:
+        return round(salaried + EXECUTIVE_BONUS, 2)
+    return salaried
+
+
+def _annual_salaries_numpy(designations, weekly_pay, hourly_pay, hours_per_week):
+    designations = np.asarray(designations, dtype=np.int8)
+    weekly_pay = np.asarray(weekly_pay, dtype=np.float64)
+    hourly_pay = np.asarray(hourly_pay, dtype=np.float64)
+    hours_per_week = np.asarray(hours_per_week, dtype=np.float64)
+
+    salaried = _round2(weekly_pay * 52)
+    hourly = _round2(hours_per_week * hourly_pay * 52)
+    executive = _round2(salaried + EXECUTIVE_BONUS)
+    return np.select([designations == HOURLY, designations == EXECUTIVE], [hourly, executive], salaried)
+
+
+# the numpy counterpart of the round(x, 2) in cal_annual_salary; np.round can break a tie the other
+# way, so values sitting next to one are redone with round()
+def _round2(values):
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= np.abs(scaled) * 1e-12 + 1e-9
+    if near_tie.any():
+        index = np.flatnonzero(near_tie)
+        rounded[index] = [round(value, 2) for value in values[index].tolist()]
+    return rounded
@@ -0,0 +1,36 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from company_management_system import Company
+
+
+class HireManyTest(unittest.TestCase):
+    def setUp(self):
+        self.company = Company(":memory:")
+
+    def tearDown(self):
+        self.company.close()
+
+    # an emp_id repeated within one batch is counted as skipped, like one already in the table
+    def test_duplicate_emp_id_in_batch_is_skipped(self):
+        rows = [(1, "Boss", 50, "IT", 90000.0, "Manager", 1),
+                (10, "First", 30, "IT", 50000.0, "Executive", 0, 1),
+                (10, "Second", 31, "HR", 60000.0, "Executive", 0)]
+        report = self.company.hire_many(rows)
+        self.assertEqual((report.inserted, report.skipped), (2, 1))
+        self.assertEqual(self.company.fetch_all_employee_data(10)[1], "First")
+        self.assertEqual([row[0] for row in self.company.management_chain(10)], [1])
+
+        report = self.company.hire_many(rows)
+        self.assertEqual((report.inserted, report.skipped), (0, 3))
+        with self.company.connection() as conn:
+            closure = conn.execute("SELECT ancestor_id, descendant_id, depth FROM company_hierarchy "
+                                   "ORDER BY descendant_id, depth").fetchall()
+        self.assertEqual(closure, [(1, 1, 0), (10, 10, 0), (1, 10, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from datetime import date, timedelta
+
+HOTEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Hotel Room Reservation System")
+sys.path.insert(0, HOTEL_DIR)
+
+# the hotel module opens HOTEL_DB when imported
+os.environ.setdefault("HOTEL_DB", ":memory:")
+import hotel_room_reservation as hotel
+
+
+def day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+class ArchiveTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        hotel.create_tables()
+        hotel.c.execute("INSERT OR IGNORE INTO rooms(room_number, room_type, rate, available) VALUES (901, 'Single', 50, 1)")
+        hotel.conn.commit()
+
+    def archived_guests(self):
+        return dict(hotel.c.execute("SELECT reservation_id, customer_name FROM {}.reservations_archive"
+                                    .format(hotel.archive_schema)).fetchall())
+
+    # archive, cancel the newest stay, book again and archive again: no id is handed out twice,
+    # so every archived stay keeps the guest it was booked for
+    def test_archived_stays_keep_their_guest(self):
+        first = hotel.make_reservation("First Guest", 901, day(-30), day(-28), 100)
+        second = hotel.make_reservation("Second Guest", 901, day(-20), day(-18), 100)
+        newest = hotel.make_reservation("Future Guest", 901, day(10), day(12), 100)
+        hotel.archive_reservations()
+
+        hotel.delete_reservation(newest)
+        late = hotel.make_reservation("Late Guest", 901, day(-10), day(-8), 100)
+        self.assertNotIn(late, (first, second, newest))
+        hotel.archive_reservations()
+
+        archived = self.archived_guests()
+        self.assertEqual({first: archived[first], second: archived[second], late: archived[late]},
+                         {first: "First Guest", second: "Second Guest", late: "Late Guest"})
+
+
+if __name__ == "__main__":
+    unittest.main()
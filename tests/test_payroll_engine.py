@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import payroll_engine
+from company_management_system import Executive, HourlyEmployee, Manager, SalariedEmployee
+
+
+def sample_employees():
+    employees = []
+    for emp_id in range(1, 401):
+        cents = emp_id * 37 % 10000 / 100
+        employees.append(HourlyEmployee(emp_id, "H", 30, "IT", 10 + cents, 20 + emp_id % 25))
+        employees.append(SalariedEmployee(emp_id, "S", 30, "IT", 500 + cents))
+        employees.append(Manager(emp_id, "M", 40, "IT", 1500 + cents, 5))
+        employees.append(Executive(emp_id, "E", 50, "IT", 3000.005 + cents, 10))
+    return employees
+
+
+class PayrollEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.employees = sample_employees()
+        self.expected = [employee.cal_annual_salary() for employee in self.employees]
+
+    def test_python_path_matches_cal_annual_salary(self):
+        columns = payroll_engine.employee_columns(self.employees)
+        self.assertEqual(list(payroll_engine._annual_salaries_python(*columns)), self.expected)
+
+    @unittest.skipUnless(payroll_engine.np is not None, "numpy is not installed")
+    def test_numpy_path_matches_cal_annual_salary(self):
+        columns = payroll_engine.employee_columns(self.employees)
+        self.assertEqual(payroll_engine._annual_salaries_numpy(*columns).tolist(), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
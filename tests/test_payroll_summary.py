@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from company_management_system import Company
+
+
+class PayrollSummaryTest(unittest.TestCase):
+    def setUp(self):
+        self.company = Company(":memory:")
+        self.company.hire_many([(1, "Boss", 50, "IT", 90000.0, "Manager", 2),
+                                (2, "Lead", 40, "IT", 70000.0, "Manager", 1, 1),
+                                (3, "Dev", 30, "IT", 50000.55, "Executive", 0, 2),
+                                (4, "Clerk", 35, "HR", 40000.0, "Executive", 0, 1)])
+
+    def tearDown(self):
+        self.company.close()
+
+    # the trigger-maintained summary matches a full recount after every kind of write
+    def test_summary_matches_recount_after_writes(self):
+        self.assertEqual(self.company.verify_payroll_summary(), [])
+        self.company.hire(5, "New", 25, "HR", 45000.0, "Executive", 0, 4, raise_errors=True)
+        self.assertEqual(self.company.verify_payroll_summary(), [])
+        self.company.raise_salary(3, 52000.10, raise_errors=True)
+        self.assertEqual(self.company.verify_payroll_summary(), [])
+        self.company.fire(2, raise_errors=True)
+        self.assertEqual(self.company.verify_payroll_summary(), [])
+        self.company.adjust_salaries(percent=3.5, amount=100, department="IT")
+        self.assertEqual(self.company.verify_payroll_summary(), [])
+
+    # fire() patches the closure table in place; the result equals a rebuild from manager_id
+    def test_closure_after_fire_equals_rebuild(self):
+        self.company.fire(2, raise_errors=True)
+        closure = "SELECT ancestor_id, descendant_id, depth FROM company_hierarchy ORDER BY 1, 2"
+        with self.company.connection() as conn:
+            patched = conn.execute(closure).fetchall()
+        self.company.rebuild_hierarchy()
+        with self.company.connection() as conn:
+            rebuilt = conn.execute(closure).fetchall()
+        self.assertEqual(patched, rebuilt)
+        self.assertEqual([row[0] for row in self.company.management_chain(3)], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()